@@ -0,0 +1,62 @@
+""" Benchmark serialization of the DATA segment
+
+Compares :class:`fcsio.data.Data.bytes` against the previous encoder,
+which packed every cell with its own ``struct.pack`` call.
+
+"""
+
+import argparse, sys, random, time
+from struct import pack
+from fcsio import FCS, FCSOptions
+
+def legacy_bytes(data,byteord):
+   """The per-cell encoder that Data.bytes replaced"""
+   ob = bytearray()
+   datatype = '<'
+   if byteord == 'big endian': datatype = '>'
+   for row in zip(*data.columns):
+      ob += b''.join([pack(datatype+'f',cell) for cell in row])
+   return bytes(ob)
+
+def make_fcs(number_of_events,channels,byteord):
+   fcs = FCS(fcs_options=FCSOptions())
+   fcs.standard.BYTEORD = byteord
+   for i in range(0,channels):
+      fcs.parameters.add('Sim_'+str(i+1),index=len(fcs.parameters))
+   fcs.data.columns = [[random.gauss(50,10) for j in range(0,number_of_events)] for i in range(0,channels)]
+   return fcs
+
+def timed(func,repeat):
+   best = None
+   for i in range(0,repeat):
+      start = time.perf_counter()
+      out = func()
+      elapsed = time.perf_counter()-start
+      if best is None or elapsed < best: best = elapsed
+   return best, out
+
+def main(args):
+   of = sys.stdout
+   for byteord in ['little endian','big endian']:
+      fcs = make_fcs(args.number_of_events,args.channels,byteord)
+      cells = args.number_of_events*args.channels
+      t_old, b_old = timed(lambda: legacy_bytes(fcs.data,byteord),args.repeat)
+      t_new, b_new = timed(lambda: fcs.data.bytes,args.repeat)
+      if b_old != b_new: raise ValueError('encoders disagree for '+byteord)
+      of.write(byteord+"\n")
+      of.write("   per-cell pack: "+'{0:.4f}'.format(t_old)+" s  "+'{0:.1f}'.format(cells/t_old/1e6)+" Mcells/s\n")
+      of.write("   Data.bytes:    "+'{0:.4f}'.format(t_new)+" s  "+'{0:.1f}'.format(cells/t_new/1e6)+" Mcells/s\n")
+      of.write("   speedup:       "+'{0:.1f}'.format(t_old/t_new)+"x\n")
+
+def do_inputs():
+   parser = argparse.ArgumentParser(
+            description = "Benchmark DATA segment serialization",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+   parser.add_argument('-n','--number_of_events',type=int,default=100000,help="Number of events")
+   parser.add_argument('-c','--channels',type=int,default=20,help="Number of data channels")
+   parser.add_argument('-r','--repeat',type=int,default=3,help="Report the best of this many runs")
+   args = parser.parse_args()
+   return args
+
+if __name__=="__main__":
+   main(do_inputs())
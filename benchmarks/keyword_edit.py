@@ -0,0 +1,80 @@
+""" Benchmark bulk keyword edits on a TEXT segment
+
+Compares :class:`fcsio.text.KeyWordDict` against the previous version,
+which kept the original keys in a list so that every delete and every
+repeat set scanned that list.
+
+"""
+
+import argparse, sys, time
+from fcsio.text import KeyWordDict
+
+class LegacyKeyWordDict:
+   """The list backed keyword store that KeyWordDict replaced, reduced to
+   the non-parameter keywords being benchmarked"""
+   def __init__(self,kvs):
+      self._d = {}
+      self._l = []
+      self._uc_to_orig = {}
+      for k,v in kvs: self[k] = v
+   def keys(self):
+      return self._l
+   def __getitem__(self,key):
+      return self._d[key.upper()]
+   def __setitem__(self,key,value):
+      uc = key.upper()
+      if uc not in self._d:
+         self._l.append(key)
+      else:
+         ind = self._l.index(self._uc_to_orig[uc])
+         self._l[ind] = key
+      self._d[uc] = str(value)
+      self._uc_to_orig[uc] = key
+   def __delitem__(self,key):
+      uc = key.upper()
+      orig = self._uc_to_orig[uc]
+      del self._uc_to_orig[uc]
+      self._l.remove(orig)
+      del self._d[uc]
+
+def edit(kwd,keywords):
+   """Rewrite every keyword, then delete every other one, as a minimize
+   or a batch rewrite across a cohort would"""
+   for i in range(0,keywords):
+      kwd['Keyword_'+str(i)] = 'new value '+str(i)
+   for i in range(0,keywords,2):
+      del kwd['KEYWORD_'+str(i)]
+   return [(k,kwd[k]) for k in kwd.keys()]
+
+def timed(func,repeat):
+   best = None
+   for i in range(0,repeat):
+      start = time.perf_counter()
+      out = func()
+      elapsed = time.perf_counter()-start
+      if best is None or elapsed < best: best = elapsed
+   return best, out
+
+def main(args):
+   of = sys.stdout
+   for keywords in [1000,10000,args.keywords]:
+      kvs = [('KEYWORD_'+str(i),'value '+str(i)) for i in range(0,keywords)]
+      t_old, old = timed(lambda: edit(LegacyKeyWordDict(kvs),keywords),args.repeat)
+      t_new, new = timed(lambda: edit(KeyWordDict(kvs),keywords),args.repeat)
+      if old != new: raise ValueError('keyword stores disagree')
+      of.write(str(keywords)+" keywords\n")
+      of.write("   list backed:  "+'{0:.4f}'.format(t_old)+" s\n")
+      of.write("   KeyWordDict:  "+'{0:.4f}'.format(t_new)+" s\n")
+      of.write("   speedup:      "+'{0:.1f}'.format(t_old/t_new)+"x\n")
+
+def do_inputs():
+   parser = argparse.ArgumentParser(
+            description = "Benchmark bulk keyword edits",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+   parser.add_argument('-k','--keywords',type=int,default=30000,help="Number of keywords in the largest TEXT")
+   parser.add_argument('-r','--repeat',type=int,default=3,help="Report the best of this many runs")
+   args = parser.parse_args()
+   return args
+
+if __name__=="__main__":
+   main(do_inputs())
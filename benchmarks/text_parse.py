@@ -0,0 +1,82 @@
+""" Benchmark parsing of the TEXT segment
+
+Compares :class:`fcsio.text.Text` against the previous parser, which
+decoded the whole segment, tokenized it with a backtracking regex and
+compiled a regex for every keyword it stored.
+
+"""
+
+import argparse, sys, re, time
+from fcsio.text import Text
+
+def legacy_parse(data):
+   """The regex tokenizer and per-key regex compile that Text replaced.
+   Returns the same (keywords, parameter data) as Text"""
+   delimiter = chr(data[0])
+   not_single_slash = '(?:[^'+delimiter+']|'+delimiter*2+')+'
+   prog = re.compile(delimiter+'('+not_single_slash+')'+delimiter+'('+not_single_slash+')')
+   miter = prog.finditer(data.decode('utf-8'))
+   vals = [(m.group(1).replace(delimiter*2,delimiter).upper(),
+           m.group(2).replace(delimiter*2,delimiter)) for m in miter]
+   d = {}
+   l = []
+   p = {}
+   for key, value in vals:
+      prog = re.compile(r'^(\$[PG])(\d+)([^\d]+)$',re.IGNORECASE)
+      uc = key.upper()
+      m = prog.match(uc)
+      if re.match(r'\$PAR$',uc): continue
+      if not m:
+         if uc not in d: l.append(key)
+         d[uc] = value
+      else:
+         index = int(m.group(2))
+         if index not in p: p[index] = {}
+         p[index][m.group(1)+'n'+m.group(3)] = value
+   return dict([(k,d[k.upper()]) for k in l]), p
+
+def make_text(parameters,keywords):
+   """A synthetic TEXT segment with escaped delimiters in some values"""
+   ostr = '/$BEGINDATA/0/$ENDDATA/0/$TOT/100000/$PAR/'+str(parameters)+'/'
+   for i in range(0,keywords):
+      ostr += 'KEYWORD_'+str(i)+'/value '+str(i)+('//with//slashes' if i % 7 == 0 else '')+'/'
+   for i in range(1,parameters+1):
+      n = str(i)
+      ostr += '$P'+n+'N/Ch'+n+'/$P'+n+'S/CD'+n+'//marker/$P'+n+'B/32/$P'+n+'E/0,0/$P'+n+'R/262144/'
+      ostr += '$P'+n+'V/500/$P'+n+'G/1.0/$P'+n+'DISPLAY/LOG/'
+   return ostr.encode('utf-8')
+
+def timed(func,repeat):
+   best = None
+   for i in range(0,repeat):
+      start = time.perf_counter()
+      out = func()
+      elapsed = time.perf_counter()-start
+      if best is None or elapsed < best: best = elapsed
+   return best, out
+
+def main(args):
+   of = sys.stdout
+   for parameters, keywords in [(50,100),(500,1000),(args.parameters,args.keywords)]:
+      data = make_text(parameters,keywords)
+      t_old, old = timed(lambda: legacy_parse(data),args.repeat)
+      t_new, text = timed(lambda: Text(data),args.repeat)
+      new = (dict([(k,text[k]) for k in text.keys()]),text.parameter_data)
+      if old != new: raise ValueError('parsers disagree')
+      of.write(str(len(data))+" bytes, "+str(parameters)+" parameters, "+str(keywords)+" keywords\n")
+      of.write("   regex parser: "+'{0:.4f}'.format(t_old)+" s\n")
+      of.write("   Text:         "+'{0:.4f}'.format(t_new)+" s\n")
+      of.write("   speedup:      "+'{0:.1f}'.format(t_old/t_new)+"x\n")
+
+def do_inputs():
+   parser = argparse.ArgumentParser(
+            description = "Benchmark TEXT segment parsing",
+            formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+   parser.add_argument('-p','--parameters',type=int,default=2000,help="Number of parameters in the largest TEXT")
+   parser.add_argument('-k','--keywords',type=int,default=5000,help="Number of non-parameter keywords in the largest TEXT")
+   parser.add_argument('-r','--repeat',type=int,default=3,help="Report the best of this many runs")
+   args = parser.parse_args()
+   return args
+
+if __name__=="__main__":
+   main(do_inputs())
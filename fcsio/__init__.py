@@ -1,4 +1,4 @@
-import struct, re, sys
+import struct, re, sys, os, io, mmap
 from io import BytesIO
 from math import ceil
 from collections import namedtuple
@@ -8,12 +8,19 @@ from fcsio.data import Data
 from fcsio.text.parameters import Parameters
 from fcsio.text.standard import Standard
 from fcsio.filter import Filter
+from fcsio.writer import FCSWriter, get_header_bytes, write_datasets
 
 class FCSOptions:
    """Options for creating an empty FCS file. Now, only
    outputs a list mode little endian FCS 3.1 file.
+
+   :param datatype: optional, 'F' by default for single precision, or 'D' for double precision floating point DATA
+   :type datatype: char
    """
-   def __init__(self):
+   def __init__(self,datatype='F'):
+      if datatype not in ('F','D'):
+         raise ValueError("FCSOptions datatype must be 'F' or 'D'")
+      self._datatype = datatype
       return
    @property
    def version(self): return "FCS3.1"
@@ -22,7 +29,7 @@ class FCSOptions:
    @property
    def byteord(self): return '1,2,3,4'
    @property
-   def datatype(self): return 'F'
+   def datatype(self): return self._datatype
 
 class FCS:
    """The primary class for working with FCS file data is the FCS class.
@@ -38,25 +45,55 @@ class FCS:
    :param bytes: The raw data of the FCS file
    :param fcs: :class:`fcsio.FCS` object to create a new FCS from. Used by copy.
    :param fcs_options: :class:`fcsio.FCSOptions` Create a new FCS object without any other inputs, but requires initializaiton with FCSOptions
-   :type bytes: bytearray
+   :param load_data: optional, True by default, and if False only the header and TEXT are read from bytes. DATA is never touched, and OTHER segments are only kept if they are within bytes.
+   :type bytes: bytearray or memoryview
    :type fcs: fcsio.FCS
    :type fcs_options: fcsio.FCSOptions
+   :type load_data: bool
 
     You must specify either bytes or fcs.  not both.
     """
-   def __init__(self,bytes=None,fcs=None,fcs_options=None):
+   def __init__(self,bytes=None,fcs=None,fcs_options=None,load_data=True):
       self._version = None
       self._data = None
       self._text = None
       self._supplementary_text = None
       self._analysis = None
+      self._parameters = None
+      self._source = None # (path, byte offset of the data set) of a memory mapped file
+      self._data_start = None # byte offset of DATA within the data set
       self._other = [] # added advantage of passing by reference when doing a copy
+      self._other_ranges = [] # OTHER ranges as the header gave them
       if len([x for x in [bytes,fcs,fcs_options] if x is not None]) != 1:
          raise ValueError('Please only set FCS from one type')
-      if bytes: self._set_from_bytes(bytes)
+      if bytes: self._set_from_bytes(bytes,load_data)
       if fcs: self._set_from_fcs(fcs)
       if fcs_options: self._set_from_fcs_options(fcs_options)
 
+   @classmethod
+   def open(cls,path,load_data=True):
+      """Open an FCS file from a path by memory mapping it.
+
+      Only the header and TEXT are parsed.  DATA and OTHER segments are
+      zero-copy views of the mapped file, and events are not decoded
+      until they are first accessed.
+
+      .. note:: The file stays mapped for as long as the returned object
+                (or any segment taken from it) is referenced.
+
+      :param path: location of the FCS file
+      :param load_data: optional, True by default, and if False the DATA segment is not made available
+      :type path: string
+      :type load_data: bool
+      :return: the FCS object backed by the mapped file
+      :rtype: :class:`fcsio.FCS`
+      """
+      with open(path,'rb') as inf:
+         mapped = mmap.mmap(inf.fileno(),0,access=mmap.ACCESS_READ)
+      fcs = cls(memoryview(mapped),load_data=load_data)
+      fcs._source = (path,0)
+      return fcs
+
    def _set_from_fcs_options(self,fcs_options):
       self._version = fcs_options.version
       self._other = []
@@ -74,20 +111,27 @@ class FCS:
       self._text['$TOT'] = 0
       self._data = Data(b'',self.standard,self._text)
 
-   def _set_from_bytes(self,bytes):
+   def _set_from_bytes(self,bytes,load_data=True):
       """ Set the FCS file according to raw data """
       header = Header(bytes)
       self._version = header.version
-      self._other = [bytes[x.start:x.end+1] for x in header.other_ranges]
+      self._other_ranges = header.other_ranges
+      self._other = [bytes[x.start:x.end+1] for x in header.other_ranges
+                     if load_data or x.end < len(bytes)]
       self._text = Text(bytes[header.text_range.start:
                               header.text_range.end+1])
-      if header.data_range.in_header:
+      if not load_data:
+         """Only the metadata was asked for, leave DATA alone"""
+         self._data = Data(None,self.standard,self._text)
+      elif header.data_range.in_header:
          """We can read data from the header range"""
+         self._data_start = header.data_range.start
          self._data = Data(bytes[header.data_range.start:
                                  header.data_range.end+1],
                            self.standard,self._text)
       else:
          """We couldn't read data range from the header try the text"""
+         self._data_start = self.standard.BEGINDATA
          self._data = Data(bytes[self.standard.BEGINDATA:
                                  self.standard.ENDDATA+1],
                            self.standard,self._text)
@@ -110,22 +154,27 @@ class FCS:
 
       """header will need to be reconstructed"""
    def _set_from_fcs(self,fcs):
-      self._version = fcs.version
-      self._text = Text(fcs.text.bytes)
-      self._data = Data(fcs.data.bytes,self.standard,self._text)
       """ Set the FCS file according to another FCS file
 
-      We may want to ignore analysis and other later
+      TEXT and the events are shared copy-on-write, so nothing is
+      serialized or decoded.  We may want to ignore analysis and other later
       """
+      self._version = fcs.version
+      self._text = fcs.text.copy()
+      self._data = fcs.data.copy(self.standard,self._text)
+      self._source = fcs._source
+      self._data_start = fcs._data_start
       self._other = fcs._other
+      self._other_ranges = fcs._other_ranges
       self._analysis = fcs._analysis
       self._supplementary_text = fcs._supplementary_text
 
    def copy(self):
       """Output an fcs object that is the same content as self
 
-      Creates a new object for everything EXCEPT the OTHER fields
-      (for now)
+      The copy is copy-on-write.  It shares the TEXT keywords and the
+      events with self, and each is only duplicated when one side
+      replaces it, so copying does not cost a pass over the events.
 
       .. warning:: The copy is neither a perfect copy, nor is it memory
                    independent. OTHER fields are still
@@ -139,6 +188,21 @@ class FCS:
       """
       return FCS(fcs=self)
 
+   def iter_events(self,chunk_size=65536):
+      """Iterate over events without decoding all of them at once.
+
+      Events are decoded in blocks of chunk_size through
+      :class:`fcsio.data.Data.iter_chunks`, so memory use is bounded by
+      the block size when the DATA has not already been decoded.
+
+      :param chunk_size: number of events decoded at a time
+      :type chunk_size: int
+      :return: yields each event as a tuple of values in parameter order
+      :rtype: generator of tuples
+      """
+      for cols in self.data.iter_chunks(chunk_size):
+         for row in zip(*cols): yield row
+
    def output_constructor(self,essential=False,adjust_range=True):
       """Get the bytes of an actual file for an FCS object through the
       output_constructor method is required to be called.
@@ -159,7 +223,7 @@ class FCS:
       :return: Generate an object with methods necessary for outputing a new FCS file (bytes that can be written)
       :rtype: :class:`fcsio.FCSFactory`
       """
-      return FCSFactory(self,essential)
+      return FCSFactory(self,essential,adjust_range)
    @property
    def version(self):
       """Version as listed in the first 10 bytes of the header
@@ -219,6 +283,17 @@ class FCS:
    @other.setter
    def other(self, val):
       self._other = val
+   @property
+   def other_ranges(self):
+      """Get the byte ranges of the OTHER segments as the header of the
+      file gave them.  Unlike :class:`fcsio.FCS.other` these are known
+      when only the metadata was read, such as with
+      :class:`fcsio.read_metadata`.
+
+      :return: start and end byte offsets of each OTHER segment, empty if the FCS was not read from bytes
+      :rtype: list of :class:`fcsio.header.ByteIndecies`
+      """
+      return list(self._other_ranges)
 
    @property
    def parameters(self):
@@ -239,7 +314,8 @@ class FCS:
       .. note:: Parameters can be reassigned. The setter for parameters
                 is the easiest way to subset, remove or reorder parameters.
       """
-      return Parameters(self.text,self.data)
+      if self._parameters is None: self._parameters = Parameters(self.text,self.data)
+      return self._parameters
    @parameters.setter
    def parameters(self,val): self.parameters.reassign([x for x in val])
 
@@ -269,6 +345,125 @@ class FCS:
       """
       return Filter(self)
 
+def read_metadata(source):
+   """Read only the header and TEXT of an FCS file.
+
+   Only the bytes up to the end of the TEXT segment are read, so no
+   part of the DATA, ANALYSIS or OTHER segments is touched.  This is the
+   fast way to take an inventory of keywords and parameters.
+
+   :param source: a path or a binary handle positioned at the start of the file
+   :type source: string or binary file handle
+   :return: an FCS object with TEXT but without events
+   :rtype: :class:`fcsio.FCS`
+   """
+   inf = source
+   if isinstance(source,str): inf = open(source,'rb')
+   try:
+      head = inf.read(58)
+      text_end = int(head[18:26].decode('ascii'))
+      head += inf.read(text_end+1-len(head))
+   finally:
+      if inf is not source: inf.close()
+   return FCS(head,load_data=False)
+
+DataSetOffsets = namedtuple('DataSetOffsets',['start','end','text_start','text_end'])
+"""0-indexed byte offsets within the file of the first and last byte of a data set and of its TEXT segment"""
+
+def open_all(path,fcs_class=None):
+   """Open every data set in an FCS file that holds more than one.
+
+   The file is memory mapped and the $NEXTDATA chain is followed once
+   to index where each data set starts. Indexing a data set parses
+   only that data set.
+
+   .. code-block:: python
+
+      datasets = fcsio.open_all('multi.fcs')
+      third = datasets[2]
+
+   :param path: location of the FCS file
+   :param fcs_class: optional, the class to construct each data set with, :class:`fcsio.FCS` by default
+   :type path: string
+   :type fcs_class: class
+   :return: the data sets of the file
+   :rtype: :class:`fcsio.DataSets`
+   """
+   with open(path,'rb') as inf:
+      mapped = mmap.mmap(inf.fileno(),0,access=mmap.ACCESS_READ)
+   return DataSets(memoryview(mapped),fcs_class,path)
+
+class DataSets:
+   """A sequence of the data sets in one FCS file, indexed by following
+   $NEXTDATA.  Each data set is parsed only when it is accessed.
+
+   :param bytes: The raw data of the FCS file
+   :param fcs_class: optional, the class to construct each data set with, :class:`fcsio.FCS` by default
+   :param path: optional, the file that bytes is mapped from, so unchanged DATA can be copied file to file when written
+   :type bytes: bytearray or memoryview
+   :type fcs_class: class
+   :type path: string
+   """
+   def __init__(self,bytes,fcs_class=None,path=None):
+      self._bytes = bytes
+      self._path = path
+      self._fcs_class = fcs_class if fcs_class else FCS
+      self._offsets = []
+      start = 0
+      while True:
+         header = Header(bytes[start:start+58])
+         text = Text(bytes[start+header.text_range.start:
+                           start+header.text_range.end+1])
+         nextdata = int(text['$NEXTDATA']) if '$NEXTDATA' in text else 0
+         end = start+nextdata-1 if nextdata > 0 else len(bytes)-1
+         self._offsets.append(DataSetOffsets(start,end,
+                                             start+header.text_range.start,
+                                             start+header.text_range.end))
+         if nextdata <= 0: break
+         start += nextdata
+         if start+58 > len(bytes):
+            raise ValueError('$NEXTDATA points past the end of the file')
+
+   @property
+   def offsets(self):
+      """Get where each data set is in the file
+
+      :return: offsets of each data set in file order
+      :rtype: list of :class:`fcsio.DataSetOffsets`
+      """
+      return self._offsets
+   def __len__(self):
+      return len(self._offsets)
+   def __getitem__(self,k):
+      o = self._offsets[k]
+      fcs = self._fcs_class(self._bytes[o.start:o.end+1])
+      if self._path is not None: fcs._source = (self._path,o.start)
+      return fcs
+   def __iter__(self):
+      for k in range(0,len(self._offsets)): yield self[k]
+
+def _kernel_copy(src,dst,offset,count,position):
+   """Copy count bytes from offset in file descriptor src to position in
+   file descriptor dst without passing them through Python.  Returns the
+   number of bytes copied, which is short if the kernel could not do it"""
+   done = 0
+   if hasattr(os,'copy_file_range'):
+      try:
+         while done < count:
+            n = os.copy_file_range(src,dst,count-done,offset+done,position+done)
+            if n == 0: break
+            done += n
+      except OSError: pass # e.g. not supported between these file systems
+   if done < count and hasattr(os,'sendfile'):
+      try:
+         os.lseek(dst,position+done,os.SEEK_SET)
+         while done < count:
+            n = os.sendfile(dst,src,offset+done,count-done)
+            if n == 0: break
+            done += n
+      except OSError: pass
+   return done
+
 class FCSFactory:
    """A class to hold a created header and byte values
    so that data and text bytes corresponding to the header
@@ -295,16 +490,21 @@ class FCSFactory:
    """
    def __init__(self,fcs,essential=False,adjust_range=True):
       self._essential=essential # only output the essential data?
+      fcs.standard.NEXTDATA = 0 # a single data set is output
       self._other = fcs._other #set this early on because we may want to skip it
       if self._essential: self._other = []
 
       #go through and adjust range for $PnR if adjust_range
       if adjust_range:
-         for p in fcs.parameters:
-            i = p.index
-            mat = fcs.data.matrix
-            if len(mat) == 0: p.range = 1 # no data, so just default to one
-            else: p.range = ceil(max([row[i-1] for row in mat]))
+         for p, stats in zip(fcs.parameters,fcs.data.stats()):
+            if stats.count == 0: p.range = 1 # no data, so just default to one
+            elif fcs.standard.DATATYPE == 'I': p.range = stats.max+1 # integer values run 0 to $PnR-1
+            else: p.range = ceil(stats.max)
+
+      #floating point types have a fixed $PnB
+      if fcs.standard.DATATYPE in ('F','D'):
+         bits = 32 if fcs.standard.DATATYPE == 'F' else 64
+         for p in fcs.parameters: p.bits = bits
 
       #header is reconstructed
       basic_header_length = 58
@@ -319,26 +519,25 @@ class FCSFactory:
 
       text_buffer = 1000 # add a buffer to fix this
 
-      data_bytes = fcs.data.bytes
+      """unchanged events are written straight from the DATA that was read"""
+      self._data_bytes = fcs.data.raw
+      self._passthrough = None
+      if self._data_bytes is None:
+         self._data_bytes = fcs.data.bytes
+      elif fcs._source is not None:
+         path, base = fcs._source
+         self._passthrough = (path,base+fcs._data_start+fcs.data._raw_offset)
       real_data_start = text_end + text_buffer + 1
-      real_data_end = real_data_start + len(data_bytes)-1
-      data_start = real_data_start # for display
-      data_end = real_data_end
-      fcs.standard.BEGINDATA = data_start
-      fcs.standard.ENDDATA = data_end
+      real_data_end = real_data_start + len(self._data_bytes)-1
+      fcs.standard.BEGINDATA = real_data_start
+      fcs.standard.ENDDATA = real_data_end
 
       text_bytes = fcs.text.bytes
       dif = text_buffer-(len(text_bytes)-len(old_text_bytes))
       if len(text_bytes) - len(old_text_bytes) > 100: raise ValueError('problem in conundrum condition in header constructor. buffer is not working right. implementation problem')
       text_end = text_start+len(text_bytes)-1
 
-      if data_end > 99999999:
-         #so ugly. but this is the case for large data. you get it from TEXT
-         data_start = 0
-         data_end = 0
-
       #need to implement analysis some day
-      analysis_start = 0
       analysis_end = 0
 
       #Put other segements after the supplemental text 
@@ -348,24 +547,16 @@ class FCSFactory:
       other_prev = sorted([real_data_end,
                            analysis_end,
                            fcs.standard.ENDSTEXT])[-1]
-      other_str = ''
+      other_ranges = []
       for segment in self._other:
-         other_str += str(other_prev+1).rjust(other_padding_length)
-         other_str += str(other_prev+len(segment)).rjust(other_padding_length)
+         other_ranges.append((other_prev+1,other_prev+len(segment)))
          other_prev += len(segment)
-      ostr =  fcs.version.ljust(10)
-      ostr += str(text_start).rjust(8) # TEXT start
-      ostr += str(text_end).rjust(8) # TEXT end
-      ostr += str(data_start).rjust(8)
-      ostr += str(data_end).rjust(8)
-      ostr += str(analysis_start).rjust(8)
-      ostr += str(analysis_end).rjust(8)
-      ostr += other_str
       """accessable properties"""
-      self._header_bytes = bytes(ostr,'ascii')
+      self._header_bytes = get_header_bytes(fcs.version,text_start,text_end,
+                                            real_data_start,real_data_end,
+                                            other_ranges)
       self._text_bytes = text_bytes
       self._dif = dif
-      self._data_bytes = data_bytes
       self._text = fcs.text
       self._standard = fcs.standard
       self._parameters = fcs.parameters
@@ -421,6 +612,7 @@ class FCSFactory:
       :return: the bytes in the DATA segment
       :rtype: bytearray
       """
+      if isinstance(self._data_bytes,memoryview): return bytes(self._data_bytes)
       return self._data_bytes
 
    @property
@@ -451,9 +643,50 @@ class FCSFactory:
       return self.header_bytes+\
              self.text_bytes+\
              bytes(' '*self._dif,'ascii')+\
-             self.data_bytes+\
+             self._data_bytes+\
              b''.join(self._other)+\
              bytes('0'*8,'ascii') # add the CRC
+
+   def write_to(self,fh):
+      """Write the FCS file to a binary handle one segment at a time,
+      without first joining the segments into one bytes object like
+      :class:`fcsio.FCSFactory.fcs_bytes` does.
+
+      If the events are unchanged from a file opened with
+      :class:`fcsio.FCS.open`, the DATA segment is written straight from
+      the mapped file.  When the output is a regular file it is copied
+      file to file by the kernel with ``os.copy_file_range`` or
+      ``os.sendfile`` where they are available.
+
+      :param fh: a writable binary handle
+      :type fh: binary file handle
+      :return: the number of bytes written
+      :rtype: int
+      """
+      fh.write(self.header_bytes)
+      fh.write(self.text_bytes)
+      fh.write(bytes(' '*self._dif,'ascii'))
+      self._write_data(fh)
+      for segment in self._other: fh.write(segment)
+      fh.write(bytes('0'*8,'ascii')) # add the CRC
+      return len(self.header_bytes)+len(self.text_bytes)+self._dif+\
+             len(self._data_bytes)+sum([len(x) for x in self._other])+8
+
+   def _write_data(self,fh):
+      """write DATA, copying it in the kernel when both ends are files"""
+      data = self._data_bytes
+      if self._passthrough is None or len(data) == 0 or \
+         not isinstance(fh,(io.BufferedWriter,io.BufferedRandom,io.FileIO)) or \
+         not fh.seekable():
+         fh.write(data)
+         return
+      path, offset = self._passthrough
+      fh.flush()
+      position = fh.tell()
+      with open(path,'rb') as inf:
+         done = _kernel_copy(inf.fileno(),fh.fileno(),offset,len(data),position)
+      fh.seek(position+done)
+      if done < len(data): fh.write(data[done:])
    def __str__(self):
       """Just print the header with spaces replaced with astrix characters"""
       return self.header_bytes.decode('ascii').replace(' ','*')
@@ -0,0 +1,29 @@
+"""Each module here is a command of the command line utility"""
+
+import sys, gzip, os
+from fcsio import FCS
+
+def read_fcs(path,output=None,load_data=True):
+   """Read the input FCS of a command
+
+   Plain files are memory mapped with :meth:`fcsio.FCS.open`.  STDIN and
+   '.gz' files are read into memory, and so is a plain file that is also
+   the output, because opening the output truncates the file under the
+   map.
+
+   :param path: input FCS file, '-' for STDIN
+   :param output: optional, the output file of the command
+   :param load_data: optional, True by default, and if False the DATA segment is not made available
+   :type path: string
+   :type output: string
+   :type load_data: bool
+   :return: the input
+   :rtype: :class:`fcsio.FCS`
+   """
+   if path == '-':
+      return FCS(sys.stdin.buffer.read(),load_data=load_data)
+   if path[-3:] == '.gz':
+      with gzip.open(path,'rb') as inf: return FCS(inf.read(),load_data=load_data)
+   if output and os.path.exists(output) and os.path.samefile(path,output):
+      with open(path,'rb') as inf: return FCS(inf.read(),load_data=load_data)
+   return FCS.open(path,load_data=load_data) # plain files are memory mapped
@@ -2,18 +2,18 @@
 of parameters"""
 
 import argparse, sys, gzip, re, io
-from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
    # make sure theres only one stdin at most
    if len([x for x in args.input if x == '-']) > 1:
       raise ValueError("cannot use stdin - multiple times")
+   fcs_files = [read_fcs(x,args.output) for x in args.input]
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
-   fcs_files = [FCS(get_handle(x).read()) for x in args.input]
    fcs = fcs_files[0]
    others = []
    if len(fcs_files) > 1:
@@ -37,18 +37,11 @@ def main(args):
       for row in omat:
          mat.append(row)
    fcs.data.matrix = mat
-   of.write(fcs.output_constructor().fcs_bytes)
+   fcs.output_constructor().write_to(of)
    #[x.close() for x in handles] # read the bytes and close inputs
    of.close()
    return
 
-def get_handle(val):
-   inf = sys.stdin.buffer
-   if val != '-':
-      if val[-3:] == '.gz': inf = gzip.open(val,'rb')
-      else: inf = open(val,'rb')
-   return inf
-
 def do_inputs():
    parser = argparse.ArgumentParser(
             description = "Concatonate multiple FCS files",
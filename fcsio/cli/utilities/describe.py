@@ -1,42 +1,53 @@
 """ Provide a description of the FCS file and its contents """
 
 import argparse, sys, gzip, re, io
-from fcsio import FCS
+from fcsio import read_metadata
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   if args.stats:
+      fcs = read_fcs(args.input,args.output)
+   else:
+      """only the header and TEXT are read, so DATA is never read even from STDIN"""
+      inf = sys.stdin.buffer
+      if args.input != '-':
+         if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
+         else: inf = open(args.input,'rb')
+      fcs = read_metadata(inf)
+      if inf is not sys.stdin.buffer: inf.close()
    of = sys.stdout
    if args.output:
-      if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
-      else: of = open(args.output,'wb')
-   inf.close() # read the bytes and close inputs
+      if args.output[-3:] == '.gz': of = gzip.open(args.output,'wt')
+      else: of = open(args.output,'w')
 
    describe_header(fcs,of)
    of.write("\n")
    describe_text(fcs,of)
    of.write("\n")
-   describe_data(fcs,of)
+   describe_data(fcs,of,args.stats)
 
-def describe_data(fcs,of):
-   mat = fcs.data.matrix
+def describe_data(fcs,of,stats=False):
    of.write("*** FCS DATA Information ***\n")
-   of.write("Events: "+str(len(mat))+"\n")
+   of.write("Events: "+str(fcs.data.event_count)+"\n")
+   if not stats: return
+   """statistics are found a block of events at a time"""
+   of.write("Parameter statistics (count, min, max)\n")
+   i = 0
+   for parameter, s in zip(fcs.parameters,fcs.data.stats()):
+      i += 1
+      of.write("   "+str(i)+". "+parameter.short_name+" \t"+str(s.count)+"\t"+str(s.min)+"\t"+str(s.max)+"\n")
 
 def describe_text(fcs,of):
    of.write("*** FCS TEXT Information ***\n")
    keys = sorted(fcs.text.keys())
    """Do standard non-parameter keywords first"""
-   standard = [x for x in keys if re.match('\$',x)]
+   standard = [x for x in keys if re.match(r'\$',x)]
    of.write(str(len(standard))+" standard non-parameter keywords\n")
    for k in standard:
       of.write("   "+k+" \t"+fcs.text[k]+"\n")
    """Do nonstandard keywords"""
-   nonstandard = [x for x in keys if not re.match('\$',x)]
+   nonstandard = [x for x in keys if not re.match(r'\$',x)]
    if len(nonstandard) == 0:
       of.write("0 non-standard keywords\n")
    else:
@@ -66,13 +77,15 @@ def describe_header(fcs,of):
       analysis_string = 'True, '
       analysis_string +=str(fcs.standard.ENDANLYSIS-fcs.standard.BEGINANALYSIS+1)+' bytes'
    of.write("ANALYSIS: "+analysis_string+"\n")
+   """OTHER is described from the header ranges so it need not be read"""
+   ranges = fcs.other_ranges
    other_string = 'False'
-   if len(fcs.other) > 0:
+   if len(ranges) > 0:
       other_string = 'True, '
       word = 'segment'
-      if len(fcs.other) > 1: word = 'segments'
-      other_string += str(len(fcs.other))+' '+word+', '
-      other_string += str(sum([len(x) for x in fcs.other]))+' bytes'
+      if len(ranges) > 1: word = 'segments'
+      other_string += str(len(ranges))+' '+word+', '
+      other_string += str(sum([x.end-x.start+1 for x in ranges]))+' bytes'
    of.write('OTHER: '+other_string+"\n")
 
 def do_inputs():
@@ -81,6 +94,7 @@ def do_inputs():
             formatter_class=argparse.ArgumentDefaultsHelpFormatter)
    parser.add_argument('input',help="Input FCS file or '-' for STDIN '.gz' files will be automatically processed by gzip")
    parser.add_argument('-o','--output',help="Output FCS file or STDOUT if not set")
+   parser.add_argument('-s','--stats',action='store_true',help="Also read the events and report the count, min and max of each parameter")
    args = parser.parse_args()
    return args
 
@@ -1,36 +1,29 @@
 """ Add a parameter to enumerate data """
 
 import argparse, sys, gzip, re, io
+from array import array
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
-   inf.close() # read the bytes and close inputs
 
    if args.short_name in [x.short_name for x in fcs.parameters]:
       raise ValueError("you cant add duplicate short names: "+args.short_name)
 
-   fcs.parameters.add(args.short_name,index=args.index)
-
-   j = fcs.parameters.indexOf(args.short_name)
-   mat = fcs.data.matrix
-   i = 0
-   for row in mat:
-      i += 1
-      if args.label is not None:
-         row[j] = args.label
-      elif args.auto_number:
-         row[j] = i
-   of.write(fcs.output_constructor().fcs_bytes)
+   if args.label is not None:
+      fcs.parameters.add(args.short_name,index=args.index,default=args.label)
+   elif args.auto_number:
+      numbers = array(fcs.data.typecode,range(1,fcs.data.event_count+1))
+      fcs.parameters.add(args.short_name,index=args.index,values=numbers)
+   else:
+      fcs.parameters.add(args.short_name,index=args.index)
+   fcs.output_constructor().write_to(of)
 
    of.close()
    return
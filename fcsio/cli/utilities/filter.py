@@ -2,19 +2,15 @@
 
 import argparse, sys, gzip, re, io
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
-   inf.close() # read the bytes and close inputs
 
 
    # BEGIN FILTERS
@@ -24,25 +20,61 @@ def main(args):
       f2 = fcs.filter.events(range(args.event_range[0]-1,args.event_range[1]))
 
    elif args.event_downsample_random is not None:
-      rset = list(range(0,fcs.standard.TOT))
-      random.shuffle(rset)
-      rset = sorted(rset[0:args.random])
-      f2 = fcs.filter.events(rset)
+      f2 = fcs.filter.downsample(args.event_downsample_random,seed=args.seed)
+
+   elif args.event_downsample_density is not None:
+      f2 = fcs.filter.downsample_density(args.density_parameters,args.event_downsample_density,
+                                         bins=args.density_bins,cofactor=args.density_cofactor,seed=args.seed)
 
    elif args.gate:
       if args.gate not in [p.short_name for p in fcs.parameters]:
           raise ValueError("you chose a gate not in parameters. available gates are: "+str([p.short_name for p in fcs.parameters]))
       f2 = fcs.filter.gate(args.gate,min=args.min,max=args.max)
 
+   elif args.expr:
+      f2 = fcs.filter.expression(args.expr)
+
+   elif args.polygon:
+      f2 = fcs.filter.polygon(args.polygon[0],args.polygon[1],get_pairs(args.vertices))
+
+   elif args.ellipse:
+      f2 = fcs.filter.ellipse(args.ellipse[0],args.ellipse[1],
+                              get_pair(args.center),get_pair(args.half_axes),args.angle)
+
    else:
       f2 = fcs.filter.none()
 
    # END FILTERS
 
-   of.write(f2.output_constructor().fcs_bytes)
+   f2.output_constructor().write_to(of)
    of.close()
    return
 
+def get_pair(val):
+   """read an 'x,y' pair of numbers"""
+   m = re.match(r'^\s*([^,]+),([^,]+)\s*$',val)
+   if not m: raise ValueError('expected a pair of numbers like 1.5,200 but got '+val)
+   return (float(m.group(1)),float(m.group(2)))
+
+def get_pairs(val):
+   """read 'x,y' pairs of numbers separated by ';'"""
+   return [get_pair(x) for x in val.split(';') if x.strip() != '']
+
+_point_options = ('--vertices','--center','--half_axes')
+def join_point_options(argv):
+   """argparse takes a value starting with '-' for an option, so join
+   each point option to its value, letting coordinates like -5,0 through"""
+   out = []
+   i = 0
+   while i < len(argv):
+      if argv[i] in _point_options and i+1 < len(argv):
+         out.append(argv[i]+'='+argv[i+1])
+         i += 2
+      else:
+         out.append(argv[i])
+         i += 1
+   return out
+
 def do_inputs():
    parser = argparse.ArgumentParser(
             description = "Provide a description of the FCS file and its contents ",
@@ -51,15 +83,52 @@ def do_inputs():
    parser.add_argument('-o','--output',help="Output FCS file or STDOUT if not set")
    group1 = parser.add_mutually_exclusive_group()
    group1.add_argument('--event_range',nargs=2,type=int,metavar=('start','end'),help="get events (cells) in this range (1 indexed)")
-   group1.add_argument('--event_downsample_random',type=int,metavar=('count'),help="number of cells to randomly draw")
+   group1.add_argument('--event_downsample_random',type=int,metavar=('count'),help="number of cells to randomly draw. they are sampled while streaming the events so memory scales with count")
+   group1.add_argument('--event_downsample_density',type=int,metavar=('count'),help="number of cells to draw, keeping rare cells and thinning dense regions (SPADE style). density is counted on a grid over --density_parameters")
    group1.add_argument('--gate',metavar='short_name',help="gate on short name. use min and max to define range")
+   group1.add_argument('--expr',metavar='expression',help="gate on an expression of short names, e.g. \"CD3>1.5 and CD19<0.3 or FSC-A>5e4\". quote short names with spaces or operators in double quotes or backticks")
+   group1.add_argument('--polygon',nargs=2,metavar=('x_name','y_name'),help="gate on a polygon over the x and y short names. give its vertices with --vertices")
+   group1.add_argument('--ellipse',nargs=2,metavar=('x_name','y_name'),help="gate on an ellipse over the x and y short names. give it with --center, --half_axes and optionally --angle")
+   parser.add_argument('--vertices',metavar='x,y;x,y;...',help="three or more x,y vertices of --polygon in order, separated by ';', e.g. \"-5,0;70,30;70,70\"")
+   parser.add_argument('--center',metavar='x,y',help="the center x,y of --ellipse")
+   parser.add_argument('--half_axes',metavar='x,y',help="the half axes x,y of --ellipse, before rotation")
+   parser.add_argument('--angle',type=float,default=0,help="counterclockwise rotation of --ellipse in degrees")
+   parser.add_argument('--seed',type=int,help="seed the random draw of --event_downsample_random or --event_downsample_density to get the same cells each time")
+   parser.add_argument('--density_parameters',nargs='+',metavar='short_name',help="short names that define density for --event_downsample_density, required with it. use a few informative markers, with many every event gets its own grid cell and the sample becomes uniform")
+   parser.add_argument('--density_bins',type=int,default=32,help="grid cells along each density parameter for --event_downsample_density")
+   parser.add_argument('--density_cofactor',type=float,help="grid arcsinh(value/cofactor) for --event_downsample_density, e.g. 5 for mass or 150 for fluorescence")
    parser.add_argument('--min',type=float,help="Remove events less than this number")
    parser.add_argument('--max',type=float,help="Remove events greater than this")
-   args = parser.parse_args()
+   args = parser.parse_args(join_point_options(sys.argv[1:]))
    if (args.min is None and args.max is None) and args.gate:
       parser.error("if you gate you must set --min or --max")
    if (args.min is not None or args.max is not None) and not args.gate:
       parser.error("if you set a min or a max you must set a gate")
+   if args.seed is not None and args.event_downsample_random is None and args.event_downsample_density is None:
+      parser.error("--seed is only used with --event_downsample_random or --event_downsample_density")
+   if args.event_downsample_random is not None and args.event_downsample_random < 0:
+      parser.error("--event_downsample_random must be at least 0")
+   if args.event_downsample_density is not None and args.event_downsample_density < 0:
+      parser.error("--event_downsample_density must be at least 0")
+   if args.density_bins < 1:
+      parser.error("--density_bins must be at least 1")
+   if args.event_downsample_density is not None and args.density_parameters is None:
+      parser.error("--event_downsample_density needs --density_parameters")
+   if (args.density_parameters is not None or args.density_cofactor is not None) and args.event_downsample_density is None:
+      parser.error("--density_parameters and --density_cofactor are only used with --event_downsample_density")
+   if (args.vertices is not None) != (args.polygon is not None):
+      parser.error("--polygon and --vertices go together")
+   if (args.center is not None or args.half_axes is not None or args.angle != 0) and args.ellipse is None:
+      parser.error("--center, --half_axes and --angle are only used with --ellipse")
+   if args.ellipse and (args.center is None or args.half_axes is None):
+      parser.error("--ellipse needs --center and --half_axes")
+   try:
+      if args.vertices is not None and len(get_pairs(args.vertices)) < 3:
+         parser.error("a polygon needs at least 3 vertices")
+      for val in [args.center,args.half_axes]:
+         if val is not None: get_pair(val)
+   except ValueError as e:
+      parser.error(str(e))
    return args
 
 def external_cmd(cmd):
@@ -6,7 +6,7 @@ that are the same column headers as the view command gives
 """
 
 import argparse, sys, gzip, re, io, functools
-from fcsio import FCS
+from fcsio import FCS, read_metadata
 from fcsio.cytof import FCS as FCS_CyTOF
 
 def main(args):
@@ -17,9 +17,11 @@ def main(args):
       else: inf = open(args.input,'rb')
    fcs = None
    if args.cytof:
-      fcs = FCS_CyTOF(inf.read())
+      """CyTOF metadata lives in the OTHER segment after DATA"""
+      fcs = FCS_CyTOF(inf.read(),load_data=False)
    else:
-      fcs = FCS(inf.read())
+      """only the header and TEXT are read"""
+      fcs = read_metadata(inf)
    of = sys.stdout
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'w')
@@ -2,19 +2,15 @@
 
 import argparse, sys, gzip, re, io
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
-   inf.close() # read the bytes and close inputs
 
    ps = None
    if args.short_name:
@@ -28,7 +24,7 @@ def main(args):
    if args.reverse: ps = ps[::-1]
 
    fcs.parameters = ps
-   of.write(fcs.output_constructor().fcs_bytes)
+   fcs.output_constructor().write_to(of)
 
    of.close()
    return
@@ -6,25 +6,21 @@ You can **keep** specified parameter(s) if you use the ``--inv`` option.
 
 import argparse, sys, gzip, re, io
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
 
-   inf.close()
    if args.inv:
       fcs.parameters = [x for x in fcs.parameters if x.short_name in args.short_names]
    else:
-      fcs.parameters = [x for x in fcs.parameters if x.short_name not in args.short_names]
-   of.write(fcs.output_constructor().fcs_bytes)
+      fcs.parameters.delete(args.short_names)
+   fcs.output_constructor().write_to(of)
 
    of.close()
    return
@@ -2,26 +2,22 @@
 
 import argparse, sys, gzip, re, io
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout.buffer
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
-   inf.close() # read the bytes and close inputs
 
    f2 = None # will be set in the filter of choice
    if args.essential:
       f2 = fcs.filter.minimize()
    else: f2 = fcs.filter.none()
 
-   of.write(f2.output_constructor(True).fcs_bytes)
+   f2.output_constructor(True).write_to(of)
    of.close()
    return
 
@@ -20,7 +20,7 @@ def main(args):
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'wb')
       else: of = open(args.output,'wb')
 
-   bare_bones = FCS(fcs_options=FCSOptions())
+   bare_bones = FCS(fcs_options=FCSOptions(datatype=args.datatype))
    inmat = []
    header = []
    if not args.no_header: 
@@ -37,7 +37,7 @@ def main(args):
    for param in header:
       bare_bones.parameters.add(param,index=len(bare_bones.parameters))
    bare_bones.data.matrix = inmat
-   of.write(bare_bones.output_constructor().fcs_bytes)
+   bare_bones.output_constructor().write_to(of)
    of.close()
    return
 
@@ -48,6 +48,7 @@ def do_inputs():
    parser.add_argument('input',help="Input FCS file or '-' for STDIN '.gz' files will be automatically processed by gzip")
    parser.add_argument('-o','--output',help="Output FCS file or STDOUT if not set")
    parser.add_argument('--no_header',action='store_true',help="You are not specifying a header so give generic parameter labels i.e. Param_1, Param_2, etc..")
+   parser.add_argument('--datatype',choices=['F','D'],default='F',help="Write single (F) or double (D) precision floating point DATA")
    args = parser.parse_args()
    return args
 
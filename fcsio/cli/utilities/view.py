@@ -2,27 +2,22 @@
 
 import argparse, sys, gzip, re, io
 from fcsio import FCS
+from fcsio.cli.utilities import read_fcs
 
 def main(args):
    """setup input and output handles"""
-   inf = sys.stdin.buffer
-   if args.input != '-':
-      if args.input[-3:] == '.gz': inf = gzip.open(args.input,'rb')
-      else: inf = open(args.input,'rb')
-   fcs = FCS(inf.read())
+   fcs = read_fcs(args.input,args.output)
    of = sys.stdout
    if args.output:
       if args.output[-3:] == '.gz': of = gzip.open(args.output,'w')
       else: of = open(args.output,'w')
-   inf.close() # read the bytes and close inputs
 
    if not args.no_header:
       of.write("\t".join([x.short_name for x in fcs.parameters])+"\n")
    if args.R:
       of.close()
       return
-   mat = fcs.data.matrix
-   for row in mat:
+   for row in fcs.iter_events():
       if args.simple:
          fstr = "{0:."+str(args.simple)+"f}"
          of.write("\t".join([fstr.format(x).rstrip('0').rstrip('.') for x in row])+"\n")
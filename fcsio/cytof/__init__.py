@@ -1,8 +1,8 @@
 import fcsio
-import re, struct
+import re, sys
+from array import array
 import xml.etree.ElementTree as ET
 from collections import OrderedDict
-from io import BytesIO
 
 class FCS(fcsio.FCS):
    """Extend the FCS class for CyTOF specific features"""
@@ -18,36 +18,102 @@ class FCS(fcsio.FCS):
       self._cytof = CyTOFOther(self.other[0])
       return self._cytof
 class CyTOFOther:
+   """The CyTOF OTHER segment, an xml header followed by the raw events
+   as little endian 32 bit floats, one row per event with a value for
+   each of the SegmentColumns.
+
+   Only the xml is decoded when constructed.  The raw events stay a view
+   of the OTHER bytes, which for :class:`fcsio.FCS.open` are mapped from
+   the file, and are decoded once on first use.
+
+   :param bytes: the OTHER segment
+   :type bytes: bytes or memoryview
+   """
    def __init__(self,bytes):
-      m = re.match('<([^>]+)>',bytes.decode('utf-8','ignore'))
+      view = memoryview(bytes)
+      m = re.match(b'<([^>]+)>',view)
       if not m: raise ValueError('Not a compatible FCS because not xml in OTHER')
-      tag1 = re.match('(\S+)',m.group(1)).group(1)
-      m = re.search('</'+tag1+'>',bytes.decode('utf-8','ignore'))
+      tag1 = re.match(rb'(\S+)',m.group(1)).group(1)
+      m = re.search(b'</'+tag1+b'>',view)
       if not m: raise ValueError('Unterminated xml')
-      self._xml = bytes[0:m.span()[1]].decode('utf-8')
-      self._raw = bytes[m.span()[1]:]
+      self._xml = view[0:m.span()[1]].tobytes().decode('utf-8')
+      self._raw = view[m.span()[1]:]
+      self._schema = None
+      self._values = None
 
    @property
    def xml(self): return self._xml
    @property
    def fcsheaderschema(self):
-      return FCSHeaderSchema(self._xml)
+      if self._schema is None: self._schema = FCSHeaderSchema(self._xml)
+      return self._schema
+   @property
+   def column_names(self):
+      """Get the name of each column of the raw events from SegmentColumns
+
+      :return: column names in order
+      :rtype: list of strings
+      """
+      return [col['ColumnName'] for col in self.fcsheaderschema.data.get('SegmentColumns',[])]
+   @property
+   def event_count(self):
+      """Get the number of whole rows in the raw events
+
+      :return: event count
+      :rtype: int
+      """
+      width = len(self.column_names)
+      if width == 0: raise ValueError('no SegmentColumns in the CyTOF header, so the raw events cannot be read')
+      return len(self._raw)//(4*width)
+   @property
+   def values(self):
+      """Get the raw events as one flat sequence of floats in row order,
+      decoded once and cached.  On a little endian machine this is a
+      zero copy view of the OTHER bytes, otherwise it is a byte swapped
+      copy.  A trailing partial row is left out.
+
+      :return: the values of every event, len(column_names) per event
+      :rtype: float memoryview or :class:`array.array`
+      """
+      if self._values is not None: return self._values
+      raw = self._raw[0:self.event_count*4*len(self.column_names)]
+      if sys.byteorder == 'little':
+         self._values = raw.cast('B').cast('f')
+      else:
+         self._values = array('f')
+         self._values.frombytes(raw)
+         self._values.byteswap()
+      return self._values
+   def column(self,index):
+      """Get the values of one column of the raw events.  For a view this
+      is a strided view so nothing is copied.
+
+      :param index: 0-indexed column, in the order of column_names
+      :type index: int
+      :return: the values of the column, one per event
+      :rtype: float memoryview or :class:`array.array`
+      """
+      width = len(self.column_names)
+      if index < 0 or index >= width: raise ValueError('column index out of range '+str(index))
+      return self.values[index::width]
+   @property
+   def columns(self):
+      """Get every column of the raw events by name
+
+      :return: column name to values
+      :rtype: OrderedDict
+      """
+      return OrderedDict([(name,self.column(i)) for i, name in enumerate(self.column_names)])
    @property
    def matrix(self):
-      schema = self.fcsheaderschema
-      mat = []
-      l = len(schema.data['SegmentColumns'])
-      b = BytesIO(self._raw)
-      i = 0
-      while b:
-         i+=1
-         #if i%1000000==0: print(b.tell())
-         row_bytes = b.read(4*l)
-         if len(row_bytes)==0: break
-         vals = struct.unpack('<'+str(l)+'f',b.read(4*l))
-         mat.append(list(vals))
-         #print((i,b.tell(),len(self._raw)))
-      return mat
+      """Get the raw events as rows of floats
+
+      :return: one list of values per event
+      :rtype: list of lists
+      """
+      width = len(self.column_names)
+      values = self.values.tolist()
+      return [values[i:i+width] for i in range(0,len(values),width)]
 class FCSHeaderSchema:
    """This is the xml that contains a lot of nice meta data"""
    def __init__(self,xml):
@@ -1,31 +1,304 @@
-from io import BytesIO
-from struct import unpack, pack
+import sys
+from array import array
+from collections import namedtuple
+from itertools import compress
+from fcsio.text.standard import byte_order, byte_order_numbers
+
+_float_typecodes = {'F':'f','D':'d'}
+"""array typecodes used to hold each supported floating point DATATYPE"""
+
+ColumnLayout = namedtuple('ColumnLayout',['offset','width','typecode','mask'])
+"""Byte offset and byte width of a parameter within an event, the array typecode that holds it, and the $PnR bit mask (None if all bits are used)"""
+
+def _int_typecode(width):
+   """unsigned array typecode for an integer of width bytes"""
+   for code in 'BHILQ':
+      if array(code).itemsize == width: return code
+   raise ValueError('unsupported $PnB of '+str(width*8)+' bits for DATATYPE I')
+
+def _range_mask(prange,bits):
+   """Values of an I parameter only use the bits below the power of two
+   at or above $PnR.  Return that mask, or None if every bit is used."""
+   if prange is None: return None
+   r = int(float(prange))
+   if r <= 1: return None
+   mask = (1 << (r-1).bit_length())-1
+   if mask >= (1 << bits)-1: return None
+   return mask
+
+_byte_tables = {}
+def _byte_table(mask):
+   """translation table applying a one byte mask"""
+   if mask not in _byte_tables:
+      _byte_tables[mask] = bytes([b & mask for b in range(0,256)])
+   return _byte_tables[mask]
+
+def _as_array(values,typecode):
+   """return values as an array of typecode, converting only if needed"""
+   if isinstance(values,array) and values.typecode == typecode: return values
+   if typecode in _float_typecodes.values(): return array(typecode,values)
+   return array(typecode,map(round,values))
+
+ColumnStats = namedtuple('ColumnStats',['count','min','max'])
+"""Number of events, and the smallest and largest value of a parameter (None if there are no events)"""
+
+def column_stats(values):
+   """Get the statistics of the values of one parameter in a single pass
+
+   :param values: the values
+   :type values: :class:`array.array` or list
+   :return: count, min and max
+   :rtype: :class:`fcsio.data.ColumnStats`
+   """
+   if len(values) == 0: return ColumnStats(0,None,None)
+   return ColumnStats(len(values),min(values),max(values))
+
+def merge_stats(a,b):
+   """Combine the statistics of two blocks of events of a parameter
+
+   :param a: statistics of the first block
+   :param b: statistics of the second block
+   :type a: :class:`fcsio.data.ColumnStats`
+   :type b: :class:`fcsio.data.ColumnStats`
+   :return: the statistics of both blocks together
+   :rtype: :class:`fcsio.data.ColumnStats`
+   """
+   if a.count == 0: return b
+   if b.count == 0: return a
+   return ColumnStats(a.count+b.count,min(a.min,b.min),max(a.max,b.max))
+
+def _layout_of(datatype,byteord,parameters):
+   """Resolve the layout of an event from $DATATYPE, $BYTEORD and the
+   ($PnB, $PnR) of each parameter in order.  The $BYTEORD must describe
+   a whole number of values, or a value a whole number of $BYTEORD, so
+   its order can be applied to each value."""
+   order = len(byte_order_numbers(byteord))
+   layout = []
+   offset = 0
+   for bits, prange in parameters:
+      mask = None
+      if datatype in _float_typecodes:
+         typecode = _float_typecodes[datatype]
+         width = array(typecode).itemsize
+      elif datatype == 'I':
+         bits = int(bits)
+         if bits % 8 != 0:
+            raise ValueError('unsupported $PnB of '+str(bits)+' bits for DATATYPE I')
+         width = bits//8
+         typecode = _int_typecode(width)
+         mask = _range_mask(prange,bits)
+      else:
+         raise ValueError('unsupported DATATYPE. implement in Data')
+      if width % order != 0 and order % width != 0:
+         raise ValueError('$BYTEORD '+byteord+' does not fit a value of '+str(width)+' bytes')
+      layout.append(ColumnLayout(offset,width,typecode,mask))
+      offset += width
+   return layout
+
+def _is_uniform(layout,masked=True):
+   """True if every parameter has the same type (and no mask if masked)"""
+   if len(set([c.typecode for c in layout])) != 1: return False
+   if masked and len([c for c in layout if c.mask is not None]) > 0: return False
+   return True
 
 class Data:
    """The class for working with the data attached to an fcs object
 
-   :param data: bytes of the Data segment
+   Events are held in a columnar store, one typed :class:`array.array`
+   per parameter, decoded from the DATA segment in a single call.  The
+   decode is deferred until the events are first accessed, so the DATA
+   segment can be left as a zero-copy view of a memory mapped file.
+
+   .. note:: :class:`fcsio.data.Data.matrix` is kept as a compatibility
+             accessor.  It builds a list of rows on first access and
+             those rows are used until the columns are next accessed.
+
+   :param data: bytes of the Data segment, or None if DATA was not read
    :param standard: class for interfacing with the TEXT
    :param text: main TEXT class
-   :type data: bytearray
+   :type data: bytearray or memoryview
    :type standard: :class:`fcsio.text.standard.Standard`
    :type text: :class:`fcsio.text.Text`
    """
    def __init__(self,data,standard,text):
-      bytes = BytesIO(data)
       self._standard = standard
       self._text = text
       self._matrix = None
-      datatype = '>'
-      if self._standard.BYTEORD == 'little endian':
-         datatype = '<'
-      o = []
-      if self._standard.DATATYPE != 'F':
-         raise ValueError('unsupported DATATYPE. implement in Data')
-      for i in range(0,self._standard.TOT):
-         f = unpack(datatype+'f'*self._standard.PAR,bytes.read(self._standard.PAR*4))
-         o.append(list(f))
-      self._matrix = o
+      self._columns = None
+      self._buffer = data
+      """TEXT can change before the decode, so note now how DATA was
+      written.  It is only resolved when the events are first decoded,
+      so a DATA segment that cannot be decoded is no error until then"""
+      self._format = None if data is None else self._read_format()
+      self._resolved = None # (layout, little endian) from _format
+      self._order = None # DATA column positions or added arrays, in parameter order
+      """(column, ColumnStats) keyed by _stats_key of the column.  The dict
+      is only added to in place while the columns it describes are
+      unchanged, and is replaced when they change, so it can be shared
+      with a copy"""
+      self._stats = {}
+      self._tot = self._standard.TOT
+      self._raw_offset = 0 # bytes of DATA before the first event still kept
+
+   def copy(self,standard,text):
+      """Get a Data for a copy of the FCS that shares the events with this
+      one.  No event is copied or decoded.  Column arrays are never
+      changed in place, only replaced, so either one can be changed
+      without affecting the other.  Statistics found by either one are
+      shared until one of them changes its events.
+
+      :param standard: class for interfacing with the TEXT of the copy
+      :param text: main TEXT class of the copy
+      :type standard: :class:`fcsio.text.standard.Standard`
+      :type text: :class:`fcsio.text.Text`
+      :return: the Data of the copy
+      :rtype: :class:`fcsio.data.Data`
+      """
+      if self._matrix is not None:
+         self.columns # rows can be changed in place so they are not shared
+      other = Data(None,standard,text)
+      other._buffer = self._buffer
+      other._format = self._format
+      other._resolved = self._resolved
+      other._tot = self._tot
+      other._raw_offset = self._raw_offset
+      other._order = None if self._order is None else list(self._order)
+      other._columns = None if self._columns is None else list(self._columns)
+      other._stats = self._stats
+      return other
+
+   def _decode(self):
+      """Decode the DATA segment into a list of column arrays"""
+      if self._buffer is None:
+         raise ValueError('DATA was not loaded for this FCS')
+      raw = self._buffer
+      self._buffer = None
+      order = self._order
+      if order is None: order = range(0,len(self._layout))
+      cols = self._decode_order(raw,0,self._tot,order)
+      """statistics found before the decode now belong to the decoded columns"""
+      stats = {}
+      for x, column in zip(order,cols):
+         key = self._stats_key(x)
+         if key in self._stats: stats[id(column)] = (column,self._stats[key][1])
+      self._stats = stats
+      return cols
+
+   def _decode_events(self,raw,count,parameters=None):
+      """Decode count events from raw into a list of column arrays
+
+      When every parameter shares one type the whole block is read
+      with a single frombytes.  Otherwise each parameter is gathered
+      with one strided copy per byte of its width."""
+      layout = self._layout
+      if parameters is None: parameters = range(0,len(layout))
+      if len(layout) == 0: return []
+      row = sum([c.width for c in layout])
+      raw = raw[0:row*count]
+      if _is_uniform(layout):
+         flat = array(layout[0].typecode)
+         flat.frombytes(raw)
+         if self._byteswap: flat.byteswap()
+         return [flat[i::len(layout)] for i in parameters]
+      return [self._gather(raw,row,count,layout[i]) for i in parameters]
+
+   def _decode_order(self,raw,start,count,order):
+      """Decode count events from event start for the columns in order.
+      Each entry of order is either the position of a column in DATA or
+      an array that already holds the values of an added column."""
+      row = sum([c.width for c in self._layout])
+      decoded = iter(self._decode_events(raw[start*row:(start+count)*row],count,
+                                         [x for x in order if not isinstance(x,array)]))
+      return [(x if len(x) == count else x[start:start+count]) if isinstance(x,array)
+              else next(decoded) for x in order]
+
+   def _gather(self,raw,row,count,c):
+      """Decode one parameter from event ordered bytes, applying its mask"""
+      out = bytearray(count*c.width)
+      for k in range(0,c.width):
+         stripe = bytes(raw[c.offset+k::row])
+         if c.mask is not None:
+            significance = k if self._little else c.width-1-k
+            byte_mask = (c.mask >> 8*significance) & 0xFF
+            if byte_mask != 0xFF: stripe = stripe.translate(_byte_table(byte_mask))
+         out[k::c.width] = stripe
+      column = array(c.typecode)
+      column.frombytes(out)
+      if self._byteswap: column.byteswap()
+      return column
+
+   def _read_format(self):
+      """the $DATATYPE, $BYTEORD and each ($PnB, $PnR) in TEXT now"""
+      pdata = self._text.parameter_data
+      return (self._standard.DATATYPE,self._text['$BYTEORD'],
+              [(pdata[i].get('$PnB'),pdata[i].get('$PnR')) for i in sorted(pdata)])
+
+   @property
+   def _layout(self):
+      """the layout of the events in the DATA segment as it was read"""
+      if self._resolved is None:
+         datatype, byteord, parameters = self._format
+         self._resolved = (_layout_of(datatype,byteord,parameters),byte_order(byteord) == 'little endian')
+      return self._resolved[0]
+
+   @property
+   def _little(self):
+      """True if the DATA segment as it was read is little endian"""
+      self._layout
+      return self._resolved[1]
+
+   @property
+   def _byteswap(self):
+      """True if the DATA segment as it was read differs from this machine"""
+      return self._little != (sys.byteorder == 'little')
+
+   @property
+   def _swap(self):
+      """True if the file byte order differs from this machine"""
+      return self._standard.BYTEORD != sys.byteorder+' endian'
+
+   @property
+   def _lazy(self):
+      """True while the events are still undecoded in the DATA segment"""
+      return self._matrix is None and self._columns is None and self._buffer is not None
+
+   @property
+   def layout(self):
+      """Get where each parameter sits within an event, as described by
+      $DATATYPE and each $PnB and $PnR.  This is resolved once per
+      parameter rather than once per value.
+
+      :return: the layout of each parameter in parameter order
+      :rtype: list of :class:`fcsio.data.ColumnLayout`
+      """
+      datatype, byteord, parameters = self._read_format()
+      return _layout_of(datatype,byteord,parameters)
+
+   @property
+   def typecode(self):
+      """Get the array typecode used to store new values of this DATATYPE.
+      For DATATYPE I this is the typecode of a 32 bit parameter, the $PnB
+      given to parameters by :class:`fcsio.text.parameters.Parameters.add`
+
+      :return: typecode
+      :rtype: char
+      """
+      datatype = self._standard.DATATYPE
+      if datatype in _float_typecodes: return _float_typecodes[datatype]
+      if datatype == 'I': return _int_typecode(4)
+      raise ValueError('unsupported DATATYPE. implement in Data')
+
+   @property
+   def loaded(self):
+      """Get whether events are available. False when only the metadata
+      of the file was read
+
+      :return: are events available
+      :rtype: bool
+      """
+      return self._buffer is not None or self._columns is not None or \
+             self._matrix is not None
+
    @property
    def event_count(self):
       """Get the number of events
@@ -33,21 +306,360 @@ class Data:
       :return: the event count
       :rtype: int
       """
-      return len(self.matrix)
+      if self._matrix is not None: return len(self._matrix)
+      if self._columns is None: return self._tot
+      if len(self._columns) == 0: return 0
+      return len(self._columns[0])
+   @property
+   def raw(self):
+      """Get the DATA segment as it was read, if it still holds exactly the
+      bytes that :class:`fcsio.data.Data.bytes` would build.  That is the
+      case until the events are decoded, reordered or added to, or the
+      layout or byte order in TEXT changes.  It lets unchanged events be
+      written without decoding and encoding them.
+
+      :return: the DATA segment or None if it must be encoded
+      :rtype: memoryview or None
+      """
+      if not self._lazy or self._order is not None: return None
+      if self._swap != self._byteswap: return None
+      if len([c for c in self._layout if c.mask is not None]) > 0:
+         return None # decoding would clear the masked bits
+      if [c[0:3] for c in self.layout] != [c[0:3] for c in self._layout]: return None
+      if len(self._buffer) != sum([c.width for c in self._layout])*self._tot: return None
+      return self._buffer
+
    @property
    def bytes(self):
       """Get the data
 
+      The columns are interleaved into a single event-ordered array in
+      one strided assignment per parameter, then converted to the file
+      byte order with a single byteswap.  Parameters of mixed widths are
+      scattered with one strided copy per byte of their width.
+
       :return: constructed data
       :rtype: bytearray
       """
-      ob = bytearray()
-      datatype = '<'
-      if self._standard.BYTEORD == 'big endian': datatype = '>'
-      for row in self._matrix:
-         v = b''.join([pack(datatype+'f',cell) for cell in row])
-         ob+= v
-      return bytes(ob)
+      return self.encode(self.columns)
+
+   def encode(self,cols):
+      """Encode columns of events to DATA bytes using the current layout
+      and byte order in TEXT.  This is how :class:`fcsio.data.Data.bytes`
+      is built, and it can be used on a block of events at a time.
+
+      :param cols: values for each parameter, in parameter order
+      :type cols: list of :class:`array.array` or lists
+      :return: the encoded events
+      :rtype: bytearray
+      """
+      layout = self.layout
+      if len(layout) != len(cols):
+         raise ValueError('parameters and data columns are different lengths')
+      par = len(cols)
+      count = 0 if par == 0 else len(cols[0])
+      swap = self._swap
+      if par == 0: return b''
+      if _is_uniform(layout,masked=False):
+         flat = array(layout[0].typecode)
+         flat.frombytes(bytes(count*par*flat.itemsize))
+         for i in range(0,par):
+            flat[i::par] = _as_array(cols[i],flat.typecode)
+         if swap: flat.byteswap()
+         return flat.tobytes()
+      row = sum([c.width for c in layout])
+      out = bytearray(count*row)
+      for column, c in zip(cols,layout):
+         column = _as_array(column,c.typecode)
+         if swap:
+            column = column[:]
+            column.byteswap()
+         b = column.tobytes()
+         for k in range(0,c.width):
+            out[c.offset+k::row] = b[k::c.width]
+      return bytes(out)
+
+   @property
+   def columns(self):
+      """Get the columnar store, one array per parameter in parameter order
+
+      .. warning:: These arrays are the storage itself.  Assign new
+                   columns rather than modifying them in place.
+
+      **setter:** assign a list of arrays of equal length
+
+      :return: columns
+      :rtype: list of :class:`array.array`
+      """
+      if self._matrix is not None:
+         """rows were handed out through matrix, rebuild columns from them"""
+         par = self._standard.PAR
+         if len(self._matrix) > 0: par = len(self._matrix[0])
+         typecodes = [c.typecode for c in self.layout]
+         if len(typecodes) != par: typecodes = [self.typecode]*par
+         self._columns = [_as_array([row[i] for row in self._matrix],t) for i, t in zip(range(0,par),typecodes)]
+         self._matrix = None
+      if self._columns is None: self._columns = self._decode()
+      return self._columns
+   @columns.setter
+   def columns(self,cols):
+      self._matrix = None
+      self._buffer = None
+      typecodes = [c.typecode for c in self.layout]
+      if len(typecodes) != len(cols): typecodes = [self.typecode]*len(cols)
+      self._columns = [x if isinstance(x,array) else _as_array(x,t) for x, t in zip(cols,typecodes)]
+      self._prune_stats(self._columns)
+      self._text['$TOT'] = self.event_count
+
+   def iter_chunks(self,chunk_size=65536,parameters=None):
+      """Iterate over the events in blocks of chunk_size events.
+
+      If the events have not been decoded yet, each block is decoded
+      on its own straight from the DATA segment and nothing is kept,
+      so memory use is bounded by the block size even on a memory
+      mapped file that is larger than RAM.
+
+      :param chunk_size: number of events in each block
+      :param parameters: optional, the parameter indecies (0-indexed) to include, all parameters by default
+      :type chunk_size: int
+      :type parameters: list of ints
+      :return: yields the columns of each block of events
+      :rtype: generator of lists of :class:`array.array`
+      """
+      if chunk_size < 1: raise ValueError('chunk_size must be at least 1')
+      count = self.event_count
+      raw = self._buffer
+      if self._lazy:
+         order = self._order
+         if order is None: order = range(0,len(self._layout))
+         if parameters is not None: order = [order[i] for i in parameters]
+         for start in range(0,count,chunk_size):
+            n = min(chunk_size,count-start)
+            yield self._decode_order(raw,start,n,order)
+         return
+      cols = self.columns
+      if parameters is not None: cols = [cols[i] for i in parameters]
+      for start in range(0,count,chunk_size):
+         yield [c[start:start+chunk_size] for c in cols]
+
+   def reorder(self,order):
+      """Reorder or subset the columns to follow a new order of parameters.
+
+      Only the list of columns is permuted, no values are copied.  If the
+      events have not been decoded yet, the new order is just recorded
+      and applied when DATA is decoded, so only the columns that are kept
+      are ever read.
+
+      :param order: for each parameter in its new order, the position (0-indexed) of the column that holds its values now
+      :type order: list of ints
+      """
+      order = list(order)
+      if self._lazy:
+         if self._order is not None: order = [self._order[i] for i in order]
+         self._order = order
+         self._prune_stats(order)
+         return
+      cols = self.columns
+      self._columns = [cols[i] for i in order]
+      self._prune_stats(self._columns)
+
+   def remove_columns(self,positions):
+      """Drop the columns at the given positions. The remaining columns
+      close up in order and no values are copied.  If the events have
+      not been decoded yet, the dropped columns are never decoded.
+
+      :param positions: positions (0-indexed) of the columns to drop
+      :type positions: list of ints
+      """
+      drop = set(positions)
+      if self._lazy:
+         order = self._order
+         if order is None: order = range(0,len(self._layout))
+         self._order = [x for j, x in enumerate(order) if j not in drop]
+         self._prune_stats(self._order)
+         return
+      self._columns = [c for j, c in enumerate(self.columns) if j not in drop]
+      self._prune_stats(self._columns)
+
+   def add_column(self,values=None,default=0):
+      """Append a column for a parameter added after the last one.
+
+      A constant column is made by repeating a single value in one call,
+      and given values are used as they are if they are already an array
+      of the right type.  If the events have not been decoded yet the
+      column is held aside and DATA stays undecoded.
+
+      :param values: optional, a value for every event
+      :param default: optional, 0 by default, the value of every event if values are not given
+      :type values: :class:`array.array` or list
+      :type default: float
+      """
+      count = self.event_count
+      if values is None: column = _as_array([default],self.typecode)*count
+      else: column = _as_array(values,self.typecode)
+      if len(column) != count:
+         raise ValueError('expected '+str(count)+' values got '+str(len(column)))
+      if values is None and count > 0:
+         """a constant column has known statistics"""
+         self._stats = dict(self._stats)
+         self._stats[id(column)] = (column,ColumnStats(count,column[0],column[0]))
+      if self._lazy:
+         if self._order is None: self._order = list(range(0,len(self._layout)))
+         self._order.append(column)
+         return
+      self._columns = self.columns+[column]
+
+   def _stats_key(self,x):
+      """key statistics by DATA column position before the decode and by
+      the column array itself after"""
+      if isinstance(x,array): return id(x)
+      return ('DATA',x)
+
+   def _entries(self):
+      """the DATA column positions or arrays of each parameter, that
+      statistics are keyed by"""
+      if not self._lazy: return self.columns
+      if self._order is None: return list(range(0,len(self._layout)))
+      return self._order
+
+   def _select(self,cols):
+      """Set columns that hold a selection of the events of the current
+      ones.  Statistics are found for the selected events of each column
+      whose statistics were already known, so they carry through
+      filters."""
+      known = [self._stats_key(x) in self._stats for x in self._entries()]
+      self.columns = cols
+      for column, k in zip(self._columns,known):
+         if k: self._stats[id(column)] = (column,column_stats(column))
+
+   def _prune_stats(self,entries):
+      """keep statistics only for the columns still in use"""
+      kept = {}
+      for x in entries:
+         key = self._stats_key(x)
+         if key in self._stats: kept[key] = self._stats[key]
+      self._stats = kept
+
+   def note_stats(self,index,stats):
+      """Keep statistics of a parameter that were found while passing over
+      its events for another purpose, such as building a gate mask, so
+      later calls to :class:`fcsio.data.Data.stats` reuse them.
+
+      :param index: the parameter index (0-indexed)
+      :param stats: statistics of every event of the parameter
+      :type index: int
+      :type stats: :class:`fcsio.data.ColumnStats`
+      """
+      x = self._entries()[index]
+      self._stats[self._stats_key(x)] = (x,stats)
+
+   def stats(self,index=None,find=True):
+      """Get the number of events and the smallest and largest value of
+      each parameter.
+
+      Statistics are found in a single pass over a column the first time
+      they are asked for and kept with that column, so they are reused
+      by later calls until the column is replaced.  Columns that are only
+      reordered, subset or added to keep their statistics.  If the events
+      have not been decoded yet, they are found a block at a time and the
+      decoded events are not kept.
+
+      .. warning:: Statistics follow the column arrays, so they go stale
+                   if a column is modified in place.
+
+      :param index: optional, the parameter index (0-indexed), all parameters by default
+      :param find: optional, True by default, and if False only statistics already found are given and None for the rest
+      :type index: int
+      :type find: bool
+      :return: statistics for each parameter in order, or for the one parameter asked for
+      :rtype: list of :class:`fcsio.data.ColumnStats` or :class:`fcsio.data.ColumnStats`
+      """
+      entries = self._entries()
+      keys = [self._stats_key(x) for x in entries]
+      if not find:
+         known = [self._stats[k][1] if k in self._stats else None for k in keys]
+         return known if index is None else known[index]
+      missing = [j for j in range(0,len(keys)) if keys[j] not in self._stats]
+      if index is not None: missing = [j for j in missing if j == index]
+      if len(missing) > 0 and self._lazy:
+         found = [ColumnStats(0,None,None) for j in missing]
+         for cols in self.iter_chunks(parameters=missing):
+            found = [merge_stats(t,column_stats(c)) for t, c in zip(found,cols)]
+      else:
+         found = [column_stats(entries[j]) for j in missing]
+      for j, t in zip(missing,found): self._stats[keys[j]] = (entries[j],t)
+      if index is not None: return self._stats[keys[index]][1]
+      self._prune_stats(entries)
+      return [self._stats[k][1] for k in keys]
+
+   def take(self,selection):
+      """Keep only the selected events, in the order they are selected.
+
+      A slice or range is applied with one slice of each column.  If the
+      events have not been decoded yet and the slice is contiguous, only
+      the view of the DATA segment is narrowed, so nothing is decoded or
+      copied, and statistics are found again when next asked for.
+      Otherwise statistics already known are found for the kept events.
+
+      :param selection: a slice or range of events, or the indecies (0-indexed) of the events to keep
+      :type selection: slice, range or list of ints
+      """
+      if isinstance(selection,range):
+         selection = slice(selection.start,selection.stop,selection.step)
+      if not isinstance(selection,slice):
+         selection = list(selection)
+         self._select([array(c.typecode,map(c.__getitem__,selection)) for c in self.columns])
+         return
+      if self._lazy and selection.step in (None,1):
+         start, stop, step = selection.indices(self._tot)
+         stop = max(start,stop)
+         if start == 0 and stop == self._tot: return
+         row = sum([c.width for c in self._layout])
+         self._buffer = self._buffer[start*row:stop*row]
+         self._raw_offset += start*row
+         if self._order is not None:
+            self._order = [x[start:stop] if isinstance(x,array) else x for x in self._order]
+         self._tot = stop-start
+         self._stats = {}
+         self._text['$TOT'] = self._tot
+         return
+      self._select([c[selection] for c in self.columns])
+
+   def compress(self,mask):
+      """Keep only the events where mask is true.
+
+      Each column is filtered with a single :func:`itertools.compress`.
+      If the events have not been decoded yet they are decoded and
+      filtered a block at a time, so only the kept events are held.
+      Statistics already known are found for the kept events, and are
+      kept as they are if every event is kept.
+
+      :param mask: one entry per event, true to keep the event
+      :type mask: bytes, bytearray or list of bools
+      """
+      count = self.event_count
+      if len(mask) != count:
+         raise ValueError('mask has '+str(len(mask))+' entries for '+str(count)+' events')
+      if all(mask): return
+      if not self._lazy:
+         self._select([array(c.typecode,compress(c,mask)) for c in self.columns])
+         return
+      chunk_size = 65536
+      kept = [array(c.typecode) for c in self.layout]
+      for start, cols in zip(range(0,count,chunk_size),self.iter_chunks(chunk_size)):
+         block = mask[start:start+chunk_size]
+         for k, c in zip(kept,cols): k.extend(compress(c,block))
+      self._select(kept)
+
+   def column(self,index):
+      """Get the values of a single parameter
+
+      :param index: the parameter index (0-indexed)
+      :type index: int
+      :return: the values for that parameter across all events
+      :rtype: :class:`array.array`
+      """
+      return self.columns[index]
 
    @property
    def matrix(self):
@@ -56,8 +668,11 @@ class Data:
       :return: stored data matrix
       :rtype: 2D matrix list of rows, rows are lists of float
       """
+      if self._matrix is None:
+         self._matrix = [list(row) for row in zip(*self.columns)]
       return self._matrix
    @matrix.setter
    def matrix(self,mat):
+      self._buffer = None
       self._matrix = mat
       self._text['$TOT'] = len(mat) #*self._standard.PAR
@@ -1,4 +1,11 @@
+import random
+from math import exp, log, floor, asinh
+from array import array
+from itertools import compress
+from collections import Counter
 from fcsio.text import get_required_keywords
+from fcsio.data import ColumnStats, column_stats, merge_stats
+from fcsio.gate import GateExpression, PolygonGate, EllipseGate
 class Filter:
    """ Filter an FCS class according by various options and output an FCS
 
@@ -20,13 +27,26 @@ class Filter:
       """Filter the events (or cells) by index.  This is to facilitate
       subsetting the data with random sampling.
 
-      :param row_indecies: A list of indecies (0-indexed) of events to include
-      :type row_indecies: list
+      A range or slice of events is taken with one slice of each
+      column, and on a file that has not been decoded yet only the
+      selected events are ever read.
+
+      :param row_indecies: A list of indecies (0-indexed) of events to include, or a range or slice of them
+      :type row_indecies: list, range or slice
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      self._fcs.data.take(row_indecies)
+      return self._fcs
+   def mask(self,mask):
+      """Filter the events (or cells) with a boolean mask
+
+      :param mask: one entry per event, true to include the event
+      :type mask: bytes, bytearray or list of bools
       :return: A filtered FCS
       :rtype: :class:`fcsio.FCS`
       """
-      filtered_matrix = [self._fcs.data.matrix[i] for i in row_indecies]
-      self._fcs.data.matrix = filtered_matrix
+      self._fcs.data.compress(mask)
       return self._fcs
    def gate(self,short_name,min=None,max=None):
       """Filter the FCS file based on values of a parameter
@@ -42,16 +62,219 @@ class Filter:
       :type max: float
       """
       index = self._fcs.parameters.indexOf(short_name=short_name)
-      mat = []
-      for row in self._fcs.data.matrix:
-         exclude = False
-         if min is not None:
-            if row[index] < min: exclude = True
-         if max is not None:
-            if row[index] > max: exclude = True
-         if not exclude: mat.append(row)
-      self._fcs.data.matrix = mat
+      data = self._fcs.data
+      """Statistics already found settle gates that pass or fail every event"""
+      stats = data.stats(index,find=False)
+      if stats is not None:
+         if stats.count == 0: return self._fcs
+         if (min is None or stats.min >= min) and (max is None or stats.max <= max):
+            return self._fcs
+         if (min is not None and stats.max < min) or (max is not None and stats.min > max):
+            data.columns = [array(c.typecode) for c in data.layout]
+            return self._fcs
+      """Build a mask from the gated parameter alone then apply it.  If
+      its statistics were not known they are found in the same pass"""
+      if min is None: inside = lambda v: v <= max
+      elif max is None: inside = lambda v: min <= v
+      else: inside = lambda v: min <= v <= max
+      mask = bytearray()
+      found = ColumnStats(0,None,None)
+      for cols in data.iter_chunks(parameters=[index]):
+         mask.extend(map(inside,cols[0]))
+         if stats is None: found = merge_stats(found,column_stats(cols[0]))
+      if stats is None: data.note_stats(index,found)
+      return self.mask(mask)
+   def downsample(self,count,seed=None,chunk_size=65536):
+      """Keep a random sample of count events, in their original order
+
+      The events are read as a stream a block at a time and sampled with
+      reservoir sampling (Algorithm L), which jumps directly from one
+      sampled event to the next.  Only the sample and one block of
+      events are held, so memory use does not depend on the number of
+      events in the file.
+
+      :param count: number of events to keep
+      :param seed: optional, seed for the random number generator so the sample can be repeated
+      :param chunk_size: optional, the number of events read at a time
+      :type count: int
+      :type seed: int
+      :type chunk_size: int
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      data = self._fcs.data
+      if count >= data.event_count: return self._fcs
+      if count <= 0: return self.events(range(0,0))
+      rng = random.Random(seed)
+      def uniform():
+         """a random number strictly between 0 and 1"""
+         u = rng.random()
+         while u == 0.0: u = rng.random()
+         return u
+      reservoir = [] # (event index, values) of the sample
+      w = exp(log(uniform())/count)
+      take = count+floor(log(uniform())/log(1-w)) # the next event to go in the reservoir
+      start = 0
+      for cols in data.iter_chunks(chunk_size):
+         n = min(chunk_size,data.event_count-start)
+         typecodes = [c.typecode for c in cols]
+         for i in range(len(reservoir),min(count,start+n)):
+            reservoir.append((i,[c[i-start] for c in cols]))
+         while take < start+n:
+            reservoir[rng.randrange(count)] = (take,[c[take-start] for c in cols])
+            w *= exp(log(uniform())/count)
+            take += floor(log(uniform())/log(1-w))+1
+         start += n
+      reservoir.sort(key=lambda x: x[0])
+      data.columns = [array(t,[values[j] for i, values in reservoir]) for j, t in enumerate(typecodes)]
+      return self._fcs
+   def downsample_density(self,short_names,count,bins=32,cofactor=None,seed=None,chunk_size=65536):
+      """Keep about count events, taking fewer events from dense regions
+      and keeping rare ones, in the manner of SPADE.
+
+      The local density of an event is the number of events that share
+      its cell of a grid over the chosen parameters, with bins cells
+      along each parameter between its min and max.  A target density T
+      is solved for so that keeping each event with probability
+      min(1, T/density) keeps count events on average.  Events in cells
+      at or below T are all kept.
+
+      The events are read as a stream three times: for the range of each
+      parameter (skipped if :class:`fcsio.data.Data.stats` already knows
+      them all), to count the events in each cell, and to draw the
+      sample.  Memory holds one
+      block of events, one count per occupied cell and the events kept.
+      Solving for T sorts the cells, so the whole is O(N log N) at worst.
+
+      .. note:: Use a few parameters that separate the populations. With
+                many parameters nearly every event gets a cell of its own
+                and the sample becomes uniform.
+
+      :param short_names: PnN short names of the parameters that define density
+      :param count: the number of events to keep on average
+      :param bins: optional, the number of grid cells along each parameter
+      :param cofactor: optional, if set, grid arcsinh(value/cofactor) rather than value, as is usual for cytometry intensities
+      :param seed: optional, seed for the random number generator so the sample can be repeated
+      :param chunk_size: optional, the number of events read at a time
+      :type short_names: list of strings
+      :type count: int
+      :type bins: int
+      :type cofactor: float
+      :type seed: int
+      :type chunk_size: int
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      data = self._fcs.data
+      total = data.event_count
+      if count >= total: return self._fcs
+      if count <= 0: return self.events(range(0,0))
+      if len(short_names) == 0: raise ValueError('density needs at least one parameter')
+      if bins < 1: raise ValueError('bins must be at least 1')
+      indecies = [self._fcs.parameters.indexOf(short_name=x) for x in short_names]
+
+      """a function for each parameter that gives its grid cell index"""
+      """statistics not known yet are found for every parameter in one pass"""
+      known = [data.stats(i,find=False) for i in indecies]
+      missing = [j for j in range(0,len(indecies)) if known[j] is None]
+      if len(missing) > 0:
+         found = [ColumnStats(0,None,None) for j in missing]
+         for cols in data.iter_chunks(chunk_size,[indecies[j] for j in missing]):
+            found = [merge_stats(t,column_stats(c)) for t, c in zip(found,cols)]
+         for j, t in zip(missing,found):
+            known[j] = t
+            data.note_stats(indecies[j],t)
+      binners = []
+      for stats in known:
+         low, high = stats.min, stats.max
+         if cofactor: low, high = asinh(low/cofactor), asinh(high/cofactor)
+         width = (high-low)/bins if high > low else 1.0
+         if cofactor:
+            binners.append(lambda v,low=low,width=width: min(int((asinh(v/cofactor)-low)/width),bins-1))
+         else:
+            binners.append(lambda v,low=low,width=width: min(int((v-low)/width),bins-1))
+      def cells(cols):
+         """one int per event naming its grid cell"""
+         keys = list(map(binners[0],cols[0]))
+         for j in range(1,len(cols)):
+            step = bins**j
+            keys = list(map(lambda k,b: k+b*step,keys,map(binners[j],cols[j])))
+         return keys
+
+      density = Counter()
+      for cols in data.iter_chunks(chunk_size,indecies): density.update(cells(cols))
+
+      """solve sum over cells of min(cell count, T) = count for T"""
+      counts = sorted(density.values())
+      below = 0 # events in cells smaller than the current one
+      target = counts[-1]
+      for k, c in enumerate(counts):
+         if below+c*(len(counts)-k) >= count:
+            target = (count-below)/(len(counts)-k)
+            break
+         below += c
+      keep = dict([(cell,min(1.0,target/c)) for cell, c in density.items()])
+
+      rng = random.Random(seed)
+      kept = [array(c.typecode) for c in data.layout]
+      for cols in data.iter_chunks(chunk_size):
+         mask = bytearray(map(lambda cell: rng.random() < keep[cell],cells([cols[i] for i in indecies])))
+         for k, c in zip(kept,cols): k.extend(compress(c,mask))
+      data.columns = kept
       return self._fcs
+   def expression(self,expression):
+      """Filter the FCS file with a gate expression over any number of
+      parameters, such as ``CD3>1.5 and CD19<0.3 or FSC-A>5e4``.
+      The expression is compiled once and evaluated in a single pass
+      over only the parameters it names.
+
+      :alsosee: :class:`fcsio.gate.GateExpression`
+
+      :param expression: the gate
+      :type expression: string or :class:`fcsio.gate.GateExpression`
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      if not isinstance(expression,GateExpression): expression = GateExpression(expression)
+      return self.mask(expression.mask(self._fcs))
+   def polygon(self,x_name,y_name,vertices):
+      """Filter the FCS file with a polygon gate on two parameters.
+      Events outside the bounding box of the polygon are rejected
+      before the exact point in polygon test.
+
+      :alsosee: :class:`fcsio.gate.PolygonGate`
+
+      :param x_name: PnN short name of the x parameter
+      :param y_name: PnN short name of the y parameter
+      :param vertices: the (x, y) vertices in order
+      :type x_name: string
+      :type y_name: string
+      :type vertices: list of (float,float) tuples
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      return self.mask(PolygonGate(x_name,y_name,vertices).mask(self._fcs))
+   def ellipse(self,x_name,y_name,center,half_axes,angle=0):
+      """Filter the FCS file with an ellipse gate on two parameters.
+      Events outside the bounding box of the ellipse are rejected
+      before the exact test.
+
+      :alsosee: :class:`fcsio.gate.EllipseGate`
+
+      :param x_name: PnN short name of the x parameter
+      :param y_name: PnN short name of the y parameter
+      :param center: the (x, y) center
+      :param half_axes: the half lengths of the axes, along x and y before rotation
+      :param angle: optional, counterclockwise rotation in degrees
+      :type x_name: string
+      :type y_name: string
+      :type center: (float,float)
+      :type half_axes: (float,float)
+      :type angle: float
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      return self.mask(EllipseGate(x_name,y_name,center,half_axes,angle).mask(self._fcs))
    def parameters(self,short_names=None):
       #if short_names is None: return self._fcs
       return self._fcs
@@ -0,0 +1,539 @@
+"""Gates on events that are compiled once and evaluated in one pass
+
+A gate expression combines comparisons of parameters by their short
+names.  It is parsed once into a single Python function of only the
+parameters it uses, and that function is mapped over those columns a
+block of events at a time to build a mask of the events inside.
+Polygon and ellipse gates on two parameters work the same way, and
+a :class:`fcsio.gate.GateTree` arranges gates into a hierarchy.
+
+"""
+
+import re, math
+from bisect import bisect_right
+from itertools import compress
+
+_token = re.compile(r'\s*(?:(?P<op><=|>=|==|!=|<|>)|(?P<paren>[()])|(?P<quoted>"[^"]*"|`[^`]*`)|(?P<word>[^\s<>=!()"`]+))')
+"""operators, parentheses, quoted short names and bare words"""
+
+_keywords = ('and','or','not')
+
+def _tokenize(expression):
+   """split an expression into (kind, text) tokens"""
+   tokens = []
+   pos = 0
+   expression = expression.rstrip()
+   while pos < len(expression):
+      m = _token.match(expression,pos)
+      if not m: raise ValueError('could not read gate expression at: '+expression[pos:])
+      tokens.append((m.lastgroup,m.group(m.lastgroup)))
+      pos = m.end()
+   return tokens
+
+def _mask(fcs,short_names,function,chunk_size=65536):
+   """map function over the columns of short_names a block at a time"""
+   indecies = [fcs.parameters.indexOf(short_name=x) for x in short_names]
+   data = fcs.data
+   if len(indecies) == 0:
+      return bytearray([bool(function())])*data.event_count
+   mask = bytearray()
+   for cols in data.iter_chunks(chunk_size,indecies):
+      mask.extend(map(function,*cols))
+   return mask
+
+class GateExpression:
+   """A boolean expression over parameter short names, compiled once
+
+   Comparisons (<, <=, >, >=, ==, !=) between short names and numbers
+   can be chained, as in ``0<CD4<5``, and combined with and, or, not and
+   parentheses.  A short name is any run of characters without spaces,
+   quotes, parentheses or comparison operators.  Short names that have
+   those or that read as a number can be quoted with double quotes or
+   backticks.
+
+   .. code-block:: python
+
+      gate = GateExpression('CD3>1.5 and CD19<0.3 or FSC-A>5e4')
+      mask = gate.mask(fcs)
+
+   :param expression: the gate
+   :type expression: string
+   """
+   def __init__(self,expression):
+      self._expression = expression
+      self._tokens = _tokenize(expression)
+      self._pos = 0
+      self._names = [] # short names in the order they are first used
+      if len(self._tokens) == 0: raise ValueError('empty gate expression')
+      body = self._parse_or()
+      if self._pos < len(self._tokens):
+         raise ValueError('unexpected '+self._tokens[self._pos][1]+' in gate expression')
+      args = ','.join(['v'+str(i) for i in range(0,len(self._names))])
+      self._source = 'lambda '+args+': '+body
+      """only the names v0, v1 ... and float literals can appear in source"""
+      self._function = eval(self._source,{'__builtins__':{}})
+
+   def _peek(self):
+      if self._pos >= len(self._tokens): return (None,None)
+      return self._tokens[self._pos]
+   def _next(self):
+      if self._pos >= len(self._tokens):
+         raise ValueError('gate expression ended early: '+self._expression)
+      self._pos += 1
+      return self._tokens[self._pos-1]
+   def _is_keyword(self,word):
+      kind, text = self._peek()
+      return kind == 'word' and text.lower() == word
+
+   def _parse_or(self):
+      terms = [self._parse_and()]
+      while self._is_keyword('or'):
+         self._pos += 1
+         terms.append(self._parse_and())
+      if len(terms) == 1: return terms[0]
+      return '('+' or '.join(terms)+')'
+   def _parse_and(self):
+      terms = [self._parse_not()]
+      while self._is_keyword('and'):
+         self._pos += 1
+         terms.append(self._parse_not())
+      if len(terms) == 1: return terms[0]
+      return '('+' and '.join(terms)+')'
+   def _parse_not(self):
+      if self._is_keyword('not'):
+         self._pos += 1
+         return '(not '+self._parse_not()+')'
+      if self._peek() == ('paren','('):
+         self._pos += 1
+         inner = self._parse_or()
+         if self._next() != ('paren',')'): raise ValueError('missing ) in gate expression')
+         return inner
+      return self._parse_comparison()
+   def _parse_comparison(self):
+      parts = [self._parse_operand()]
+      while self._peek()[0] == 'op':
+         parts.append(self._next()[1])
+         parts.append(self._parse_operand())
+      if len(parts) == 1:
+         raise ValueError('expected a comparison after '+self._tokens[self._pos-1][1])
+      return '('+' '.join(parts)+')'
+   def _parse_operand(self):
+      kind, text = self._next()
+      if kind == 'quoted':
+         name = text[1:-1]
+      elif kind == 'word' and text.lower() not in _keywords:
+         try:
+            value = float(text)
+            if math.isfinite(value): return repr(value)
+         except ValueError: pass
+         name = text
+      else:
+         raise ValueError('expected a short name or a number, got '+text)
+      if name not in self._names: self._names.append(name)
+      return 'v'+str(self._names.index(name))
+
+   @property
+   def expression(self):
+      """Get the expression as it was given
+
+      :return: expression
+      :rtype: string
+      """
+      return self._expression
+   @property
+   def short_names(self):
+      """Get the short names the gate uses, in the order they first appear
+
+      :return: short names
+      :rtype: list of strings
+      """
+      return list(self._names)
+   @property
+   def function(self):
+      """Get the compiled gate. It takes one value for each of
+      :class:`fcsio.gate.GateExpression.short_names` in order and is
+      true if the event is inside
+
+      :return: the gate function
+      :rtype: function
+      """
+      return self._function
+
+   def mask(self,fcs,chunk_size=65536):
+      """Evaluate the gate on every event of an FCS.
+
+      Only the columns of the parameters the gate uses are read, a block
+      of events at a time, and the compiled function is mapped over them.
+
+      :param fcs: the events to gate
+      :param chunk_size: optional, the number of events evaluated at a time
+      :type fcs: :class:`fcsio.FCS`
+      :type chunk_size: int
+      :return: one entry per event, 1 if inside the gate and 0 if not
+      :rtype: bytearray
+      """
+      return _mask(fcs,self._names,self._function,chunk_size)
+
+class PlaneGate:
+   """A gate on the plane of two parameters.  Subclasses compile their
+   shape into a function of x and y that is true inside.
+
+   :param x_name: short name of the parameter on the x axis
+   :param y_name: short name of the parameter on the y axis
+   :type x_name: string
+   :type y_name: string
+   """
+   def __init__(self,x_name,y_name):
+      self._x_name = x_name
+      self._y_name = y_name
+      self._function = None
+
+   @property
+   def short_names(self):
+      """Get the short names of the x and y parameters
+
+      :return: short names
+      :rtype: list of strings
+      """
+      return [self._x_name,self._y_name]
+   @property
+   def function(self):
+      """Get the compiled gate. It takes an x and a y value and is true if
+      the point is inside
+
+      :return: the gate function
+      :rtype: function
+      """
+      return self._function
+
+   def mask(self,fcs,chunk_size=65536):
+      """Evaluate the gate on every event of an FCS, reading only its two
+      parameters a block of events at a time
+
+      :param fcs: the events to gate
+      :param chunk_size: optional, the number of events evaluated at a time
+      :type fcs: :class:`fcsio.FCS`
+      :type chunk_size: int
+      :return: one entry per event, 1 if inside the gate and 0 if not
+      :rtype: bytearray
+      """
+      return _mask(fcs,self.short_names,self._function,chunk_size)
+
+class PolygonGate(PlaneGate):
+   """A polygon on two parameters, with points inside by the even-odd rule
+
+   The polygon is split once into horizontal bands at the y of each
+   vertex, and each band keeps only the edges that cross it.  An event
+   outside the bounding box of the polygon is rejected with two range
+   checks.  Otherwise its band is found by bisection and only the edges
+   of that band are tested, so the cost per event depends on the edges
+   crossing its band rather than on every edge of the polygon.
+
+   :param x_name: short name of the parameter on the x axis
+   :param y_name: short name of the parameter on the y axis
+   :param vertices: the (x, y) vertices in order, the polygon closes itself
+   :type x_name: string
+   :type y_name: string
+   :type vertices: list of (float,float) tuples
+   """
+   def __init__(self,x_name,y_name,vertices):
+      vertices = [(float(x),float(y)) for x, y in vertices]
+      if len(vertices) < 3: raise ValueError('a polygon needs at least 3 vertices')
+      super().__init__(x_name,y_name)
+      self._vertices = vertices
+      xs = [v[0] for v in vertices]
+      ys = [v[1] for v in vertices]
+      self._bounds = (min(xs),max(xs),min(ys),max(ys))
+      """every edge that is not horizontal, as x = x0+(y-y0)*a over [low y,high y)"""
+      edges = []
+      for (x0,y0), (x1,y1) in zip(vertices,vertices[1:]+vertices[0:1]):
+         if y0 == y1: continue
+         edges.append((min(y0,y1),max(y0,y1),x0,y0,(x1-x0)/(y1-y0)))
+      self._breaks = sorted(set(ys))
+      self._bands = [tuple([(x0,y0,a) for lo, hi, x0, y0, a in edges if lo <= self._breaks[j] and hi >= self._breaks[j+1]])
+                     for j in range(0,len(self._breaks)-1)]
+      self._function = self._compile()
+
+   def _compile(self):
+      xmin, xmax, ymin, ymax = self._bounds
+      breaks = self._breaks
+      bands = self._bands
+      last = len(bands)
+      def inside(x,y):
+         if not (xmin <= x <= xmax and ymin <= y < ymax): return False
+         j = bisect_right(breaks,y)-1
+         if j >= last: return False
+         crossings = 0
+         for x0, y0, a in bands[j]:
+            if x < x0+(y-y0)*a: crossings += 1
+         return crossings & 1 == 1
+      return inside
+
+   @property
+   def vertices(self):
+      """Get the vertices
+
+      :return: vertices
+      :rtype: list of (float,float) tuples
+      """
+      return list(self._vertices)
+class EllipseGate(PlaneGate):
+   """An ellipse on two parameters, boundary included
+
+   An event outside the bounding box of the ellipse is rejected with two
+   range checks before the exact test.
+
+   :param x_name: short name of the parameter on the x axis
+   :param y_name: short name of the parameter on the y axis
+   :param center: the (x, y) center
+   :param half_axes: the half lengths of the axes, along x and y before rotation
+   :param angle: optional, 0 by default, counterclockwise rotation of the ellipse in degrees
+   :type x_name: string
+   :type y_name: string
+   :type center: (float,float)
+   :type half_axes: (float,float)
+   :type angle: float
+   """
+   def __init__(self,x_name,y_name,center,half_axes,angle=0):
+      rx, ry = float(half_axes[0]), float(half_axes[1])
+      if rx <= 0 or ry <= 0: raise ValueError('ellipse half axes must be positive')
+      super().__init__(x_name,y_name)
+      self._center = (float(center[0]),float(center[1]))
+      self._half_axes = (rx,ry)
+      self._angle = float(angle)
+      self._function = self._compile()
+
+   def _compile(self):
+      cx, cy = self._center
+      rx, ry = self._half_axes
+      c = math.cos(math.radians(self._angle))
+      s = math.sin(math.radians(self._angle))
+      ex = math.hypot(rx*c,ry*s)
+      ey = math.hypot(rx*s,ry*c)
+      xmin, xmax, ymin, ymax = cx-ex, cx+ex, cy-ey, cy+ey
+      u = 1/(rx*rx)
+      v = 1/(ry*ry)
+      def inside(x,y):
+         if not (xmin <= x <= xmax and ymin <= y <= ymax): return False
+         dx = x-cx
+         dy = y-cy
+         p = dx*c+dy*s
+         q = dy*c-dx*s
+         return p*p*u+q*q*v <= 1
+      return inside
+
+_pack_tables = [bytes([(b & 1) << j for b in range(0,256)]) for j in range(0,8)]
+_unpack_tables = [bytes([(b >> j) & 1 for b in range(0,256)]) for j in range(0,8)]
+
+if hasattr(int,'bit_count'): _popcount = int.bit_count
+else: _popcount = lambda bits: bin(bits).count('1') # before Python 3.10
+
+def pack_mask(mask):
+   """Pack a mask with one byte per event into a bitset, an int with bit
+   i set if event i is in the mask.  Each of the eight bit positions is
+   moved into place with one strided slice and one translate.
+
+   :param mask: one entry per event, 1 if in the mask and 0 if not
+   :type mask: bytes or bytearray
+   :return: bitset
+   :rtype: int
+   """
+   bits = 0
+   for j in range(0,8):
+      bits |= int.from_bytes(bytes(mask[j::8]).translate(_pack_tables[j]),'little')
+   return bits
+
+def unpack_mask(bits,count):
+   """Unpack a bitset into a mask with one byte per event
+
+   :param bits: bitset with bit i set if event i is in the mask
+   :param count: number of events
+   :type bits: int
+   :type count: int
+   :return: one entry per event, 1 if in the mask and 0 if not
+   :rtype: bytearray
+   """
+   packed = bits.to_bytes((count+7)//8,'little')
+   mask = bytearray(len(packed)*8)
+   for j in range(0,8):
+      mask[j::8] = packed.translate(_unpack_tables[j])
+   del mask[count:]
+   return mask
+
+class GateTree:
+   """A hierarchy of gates on the events of one FCS, such as
+   lymphocytes, then singlets, then live, then CD3+ and then CD4 or CD8.
+
+   Each node keeps the events inside it and inside all of its ancestors
+   as a bitset, an int with one bit per event.  A node is evaluated
+   from its parent's bitset, and only the events that survive the
+   parent are passed to the gate, so siblings share the work of their
+   ancestors rather than repeating it.  Nodes are evaluated when first
+   needed and kept, and the nodes evaluated together share one pass
+   over the events.
+
+   .. code-block:: python
+
+      tree = GateTree(fcs)
+      tree.add('lymphocytes',PolygonGate('FSC-A','SSC-A',vertices))
+      tree.add('CD3+','CD3>1.5',parent='lymphocytes')
+      tree.add('CD4+','CD4>1 and CD8<1',parent='CD3+')
+      counts = tree.counts()
+      cd4 = tree.fcs('CD4+')
+
+   :param fcs: the events to gate
+   :param chunk_size: optional, the number of events evaluated at a time
+   :type fcs: :class:`fcsio.FCS`
+   :type chunk_size: int
+   """
+   def __init__(self,fcs,chunk_size=65536):
+      self._fcs = fcs
+      self._chunk_size = chunk_size
+      self._count = fcs.data.event_count
+      self._nodes = {} # (parent, gate) keyed by name in the order they were added
+      self._bits = {} # bitset of each node evaluated so far
+
+   def add(self,name,gate,parent=None):
+      """Add a gate below a parent, or below all events if there is none
+
+      :param name: the name of the new node
+      :param gate: a gate, or a gate expression as a string
+      :param parent: optional, the name of the parent node
+      :type name: string
+      :type gate: :class:`fcsio.gate.GateExpression`, :class:`fcsio.gate.PolygonGate`, :class:`fcsio.gate.EllipseGate` or string
+      :type parent: string
+      """
+      if name in self._nodes: raise ValueError('there is already a gate named '+str(name))
+      if parent is not None and parent not in self._nodes:
+         raise ValueError('no parent gate named '+str(parent))
+      if isinstance(gate,str): gate = GateExpression(gate)
+      self._nodes[name] = (parent,gate)
+
+   @property
+   def names(self):
+      """Get the names of the nodes in the order they were added
+
+      :return: names
+      :rtype: list of strings
+      """
+      return list(self._nodes.keys())
+   def parent(self,name):
+      """Get the name of the parent of a node
+
+      :param name: the node
+      :type name: string
+      :return: the parent, or None if the node is below all events
+      :rtype: string
+      """
+      return self._nodes[name][0]
+   def children(self,name=None):
+      """Get the names of the nodes directly below a node
+
+      :param name: optional, the node, or None for the nodes below all events
+      :type name: string
+      :return: names
+      :rtype: list of strings
+      """
+      return [k for k, (parent, gate) in self._nodes.items() if parent == name]
+
+   def bits(self,name):
+      """Get the events in a node and all of its ancestors as a bitset
+
+      :param name: the node
+      :type name: string
+      :return: an int with bit i set if event i is in the node
+      :rtype: int
+      """
+      if name not in self._bits: self._evaluate([name])
+      return self._bits[name]
+   def mask(self,name):
+      """Get the events in a node and all of its ancestors as a mask
+
+      :param name: the node
+      :type name: string
+      :return: one entry per event, 1 if in the node and 0 if not
+      :rtype: bytearray
+      """
+      return unpack_mask(self.bits(name),self._count)
+
+   def _evaluate(self,names):
+      """Evaluate the nodes in names, and their ancestors that are not
+      evaluated yet, in a single pass over the events.  Each block is
+      passed down the tree in the order nodes were added, so parents
+      come before their children."""
+      needed = set()
+      for name in names:
+         while name is not None and name not in self._bits and name not in needed:
+            needed.add(name)
+            name = self._nodes[name][0]
+      pending = [name for name in self._nodes if name in needed]
+      if len(pending) == 0: return
+      """masks of parents evaluated before"""
+      known = dict([(parent,self.mask(parent)) for parent in
+                    set([self._nodes[name][0] for name in pending])
+                    if parent is not None and parent not in needed])
+      indecies = []
+      for name in pending:
+         for short_name in self._nodes[name][1].short_names:
+            index = self._fcs.parameters.indexOf(short_name=short_name)
+            if index not in indecies: indecies.append(index)
+      """blocks of a multiple of 8 events pack to whole bytes"""
+      chunk_size = max(8,self._chunk_size-self._chunk_size%8)
+      packed = dict([(name,[]) for name in pending])
+      if len(indecies) == 0: blocks = [(start,None) for start in range(0,self._count,chunk_size)]
+      else: blocks = zip(range(0,self._count,chunk_size),
+                         self._fcs.data.iter_chunks(chunk_size,indecies))
+      for start, cols in blocks:
+         n = min(chunk_size,self._count-start)
+         masks = {}
+         for name in pending:
+            parent, gate = self._nodes[name]
+            if parent is None: keep = b'\x01'*n
+            elif parent in masks: keep = masks[parent]
+            else: keep = known[parent][start:start+n]
+            values = [cols[indecies.index(self._fcs.parameters.indexOf(short_name=x))]
+                      for x in gate.short_names]
+            masks[name] = self._inside(gate.function,values,keep)
+            packed[name].append(pack_mask(masks[name]).to_bytes((n+7)//8,'little'))
+      for name in pending:
+         self._bits[name] = int.from_bytes(b''.join(packed[name]),'little')
+
+   def _inside(self,function,values,keep):
+      """evaluate a gate function on only the events of a block set in keep"""
+      if len(values) == 0:
+         return bytearray(keep) if function() else bytearray(len(keep))
+      inside = bytearray(len(keep))
+      positions = list(compress(range(0,len(keep)),keep))
+      if len(positions) == 0: return inside
+      values = [compress(c,keep) for c in values]
+      for i in compress(positions,map(function,*values)): inside[i] = 1
+      return inside
+
+   def count(self,name):
+      """Get the number of events in a node
+
+      :param name: the node
+      :type name: string
+      :return: event count
+      :rtype: int
+      """
+      return _popcount(self.bits(name))
+   def counts(self):
+      """Get the number of events in every node.  Nodes not evaluated yet
+      are all evaluated together in a single pass over the events.
+
+      :return: event counts keyed by node name in the order nodes were added
+      :rtype: dict
+      """
+      self._evaluate(self.names)
+      return dict([(name,_popcount(self._bits[name])) for name in self._nodes])
+
+   def fcs(self,name):
+      """Get the events in a node as a new FCS
+
+      :param name: the node
+      :type name: string
+      :return: A filtered FCS
+      :rtype: :class:`fcsio.FCS`
+      """
+      return self._fcs.filter.mask(self.mask(name))
@@ -29,11 +29,10 @@ class Header:
    the file or coded in the TEXT
 
    :param data: The FCS file data (not just the first 58 bytes)
-   :type data: bytearray
+   :type data: bytearray or memoryview
    """
    def __init__(self,data):
       self._data = data
-      self._stream = BytesIO(self._data)
       b = BytesIO(self._data[0:58])
       h1 = b.read(10).decode('ascii') # 0-9
       h2 = b.read(8).decode('ascii') # 10-17
@@ -115,7 +114,7 @@ class Header:
       :rtype: list of :class:`fcsio.header.ByteIndecies`
       """
       if self.text_range.start == 58: return []
-      dat = self._data[58:self.text_range.start].decode('ascii')
+      dat = bytes(self._data[58:self.text_range.start]).decode('ascii')
       r = tuple(re.split('\s+',dat.strip()))
       if len(r) < 2: raise ValueError('Error expected at least two OTHER values in OTHER: '+dat)
       if len(r) % 2 != 0:
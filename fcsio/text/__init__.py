@@ -13,7 +13,7 @@ prior to outputting the FCS file.
 import re, sys, json
 from io import BytesIO
 from collections import namedtuple
-from fcsio.text.parameters import Parameter
+from fcsio.text.parameters import Parameter, ParameterData
 
 _required_keywords = {
    '$BEGINANALYSIS':'Byte-offset to the beginning of the ANALYSIS segment.',
@@ -99,6 +99,72 @@ _optional_keywords = {
    '$WELLID': 'Well identifier.',
    }
 
+_parameter_keyword = re.compile(r'^(\$[PG])(\d+)([^\d]+)$',re.IGNORECASE)
+"""per-parameter keywords like $P12N split into prefix, index and suffix"""
+
+_generic_parameter_keyword = re.compile(r'^(\$[PG])n([^\d]+)$')
+"""generic per-parameter keywords like $PnN split into prefix and suffix"""
+
+_padding = b' \t\r\n\x00'
+"""bytes that can pad the end of a TEXT segment"""
+
+def split_text(data):
+   """Split a TEXT segment into its keywords and values in one linear
+   pass over the bytes.
+
+   The first byte is the delimiter. A doubled delimiter is an escaped
+   delimiter inside a keyword or value (empty keywords and values are
+   not permitted, so it can not be an empty field).  Escapes are swapped
+   for a byte that does not occur in the segment so the fields can be
+   split on the delimiter directly.  Padding after the last delimiter
+   is ignored.
+
+   :param data: the bytes of the TEXT segment
+   :type data: bytearray or memoryview
+   :return: keyword and value pairs in the order they appear
+   :rtype: list of (string, string) tuples
+   """
+   data = bytes(data)
+   if len(data) == 0: return []
+   delimiter = data[0:1]
+   escaped = delimiter*2
+   placeholder = None
+   if escaped in data:
+      placeholder = next((bytes([b]) for b in range(1,128) if bytes([b]) not in data),None)
+      if placeholder is None: return _scan_text(data)
+      data = data.replace(escaped,placeholder)
+   fields = data[1:].split(delimiter)
+   last = fields.pop() # whatever follows the last delimiter
+   if last.strip(_padding): fields.append(last) # a final delimiter was left off
+   text = [x.decode('utf-8') for x in fields]
+   if placeholder is not None:
+      placeholder = placeholder.decode('ascii')
+      delimiter = delimiter.decode('ascii')
+      text = [x.replace(placeholder,delimiter) for x in text]
+   return list(zip(text[0::2],text[1::2]))
+
+def _scan_text(data):
+   """split_text for the rare segment that uses every ASCII byte, walking
+   from delimiter to delimiter"""
+   n = len(data)
+   delimiter = data[0:1]
+   escaped = delimiter*2
+   fields = []
+   start = 1
+   position = 1
+   while True:
+      i = data.find(delimiter,position)
+      if i < 0:
+         if data[start:].strip(_padding): i = n # a final delimiter was left off
+         else: break
+      if i+1 < n and data[i+1] == data[0]:
+         """an escaped delimiter, keep looking for the end of this field"""
+         position = i+2
+         continue
+      fields.append(data[start:i].replace(escaped,delimiter).decode('utf-8'))
+      start = position = i+1
+   return list(zip(fields[0::2],fields[1::2]))
+
 RegexDescriptor = namedtuple('RegexDescriptor',['regex_string','keyword','regex'])
 """Store regular expressions that describe documented keywords"""
 
@@ -106,7 +172,7 @@ def _get_regexs(keywords):
    output = []
    for key in keywords:
       parts = key.split('n')
-      regex = ('\d+'.join(parts)).replace('$','\$')+'$'
+      regex = (r'\d+'.join(parts)).replace('$',r'\$')+'$'
       output.append(RegexDescriptor(regex,key,re.compile(regex,re.IGNORECASE)))
    return output
 
@@ -119,14 +185,18 @@ class KeyWordDict:
 
    Since keywords are case inssensitive, take them to uppercase,
 
+   Both dictionaries are insertion ordered, so setting, deleting and
+   looking up a keyword are constant time while the original order of
+   keywords is kept.
+
    :param kvs: key-value pairs
    :type kvs: list of key-value pairs
    """
    def __init__(self,kvs=[]):
        self._d = {} # dictionary keyed uppercase
-       self._l = [] # list of non-parameter original values in the order we recieve them
-       self._p = {} # parameter data keyed by index then generic keyword
-       self._uc_to_orig = {} #dictionary to convert upper case and original key format
+       self._p = ParameterData() # parameter data keyed by index then generic keyword
+       self._uc_to_orig = {} #dictionary to convert upper case and original key format, in the order we recieve them
+       self._shared = False # True while the dictionaries may be shared with a copy
        """Optionally initialize with an interable list of key-value pairs"""
        for kv in kvs:
           self._do_set(kv[0],kv[1])
@@ -139,6 +209,31 @@ class KeyWordDict:
       """
       return self._p
 
+   def copy(self):
+      """Get a copy of the keywords.
+
+      The keyword dictionaries are shared with the copy and are only
+      duplicated by whichever of the two is changed first.  Parameter
+      keywords are changed in place through
+      :class:`fcsio.text.parameters.Parameter`, so they are copied now,
+      renumbered in order.
+
+      :return: the copy
+      :rtype: same class as self
+      """
+      other = self.__class__.__new__(self.__class__)
+      other.__dict__.update(self.__dict__)
+      other._p = ParameterData([(j+1,dict(self._p[i])) for j, i in enumerate(sorted(self._p))])
+      self._shared = True
+      other._shared = True
+      return other
+   def _unshare(self):
+      """take our own copy of the keyword dictionaries before a change"""
+      if not self._shared: return
+      self._d = dict(self._d)
+      self._uc_to_orig = dict(self._uc_to_orig)
+      self._shared = False
+
    def keys(self): 
       """Keywords of TEXT that can be accessed and modified.
       This does not include the parameter keywords, because they
@@ -149,9 +244,11 @@ class KeyWordDict:
       :return: list of keywords
       :rtype: list
       """
-      return self._l
+      return list(self._uc_to_orig.values())
    def __iter__(self):
       for k in self.keys(): yield k
+   def __len__(self):
+      return len(self._d)
    def __getitem__(self,key):
       uc = key.upper()
       if uc not in self._d: raise ValueError('key not in KeyWordDict')
@@ -161,9 +258,8 @@ class KeyWordDict:
       if uc not in self._uc_to_orig:
          sys.stderr.write("Warning deleting a key not present in structure. nothing happens\n")
          return
-      orig = self._uc_to_orig[uc]
+      self._unshare()
       del self._uc_to_orig[uc]
-      self._l.remove(orig)
       del self._d[uc]
    def __setitem__(self,key,value):
       if key == '': raise ValueError('Empty strings are not permitted for key value pairs')
@@ -171,22 +267,16 @@ class KeyWordDict:
       self._do_set(key,value)
 
    def _do_set(self,key,value):
-       prog = re.compile('^(\$[PG])(\d+)([^\d]+)$',re.IGNORECASE)
        #print('set item '+key+' '+str(value))
        uc = key.upper()
-       temp_param = {}
-       m = prog.match(uc)
-       if re.match('\$PAR$',uc):
+       m = _parameter_keyword.match(uc) if uc[0:2] in ('$P','$G') else None
+       if uc == '$PAR':
           """totally ignore the PAR parameter"""
           return
        if not m:
-          """Add non-parameter key words to the list and dictionary"""
-          if uc not in self._d:
-             self._l.append(key)
-          else:
-             #sys.stderr.write("Warning repeat key. Overwrites values\n")
-             ind = self._l.index(self._uc_to_orig[uc])
-             self._l[ind] = key
+          """Add non-parameter key words to the dictionaries. A repeat
+          key overwrites the value but keeps its place"""
+          self._unshare()
           self._d[uc] = str(value)
           self._uc_to_orig[uc] = key
        else:
@@ -216,16 +306,8 @@ class Text(KeyWordDict):
          self._delimiter=chr(data[0])
          """If we have data, go ahead and initialize
 
-         Decode keyword value pairs
-
-         Tricky Regex for not getting escaped forward slashes"""
-         not_single_slash = '(?:[^'+self._delimiter+']|'+self._delimiter*2+')+'
-         prog = re.compile(self._delimiter+'('+not_single_slash+')'+self._delimiter+'('+not_single_slash+')')
-         miter = prog.finditer(data.decode('utf-8'))
-         """Bake removing the escape characters into generating the
-         key value pairs"""
-         vals = [(m.group(1).replace(self._delimiter*2,self._delimiter).upper(),
-                 m.group(2).replace(self._delimiter*2,self._delimiter)) for m in miter]
+         Decode keyword value pairs with a single scan over the bytes"""
+         vals = [(k.upper(),v) for k, v in split_text(data)]
          super().__init__(vals)
       else:
          """If no data start with an empty text field"""
@@ -248,7 +330,7 @@ class Text(KeyWordDict):
       :rtype: bytearray
       """
       ostr = self._delimiter
-      prog = re.compile('^(\$[PG])n([^\d]+)$')
+      prog = _generic_parameter_keyword
       for key in self.keys():
          ostr+=key.replace(self._delimiter,self._delimiter*2)+self._delimiter\
               +self[key].replace(self._delimiter,self._delimiter*2)+self._delimiter
@@ -260,7 +342,7 @@ class Text(KeyWordDict):
          for type in types:
             m = prog.match(type)
             key = m.group(1)+str(true_index)+m.group(2)
-            ostr += key+self._delimiter+self.parameter_data[i][type]+self._delimiter
+            ostr += key+self._delimiter+self.parameter_data[i][type].replace(self._delimiter,self._delimiter*2)+self._delimiter
       return bytes(ostr.encode('utf-8'))
 
    def __str__(self):
@@ -1,4 +1,5 @@
 import math
+from array import array
 import re, sys, json
 
 _param = {'B':'Number of bits reserved for parameters n',
@@ -16,12 +17,86 @@ _param = {'B':'Number of bits reserved for parameters n',
           'T':'Detector type for parameter n',
           'V':'Detector voltage for parameter n'}
 
+class ParameterData(dict):
+   """Parameter keywords keyed by index then generic keyword, the
+   storage behind :class:`fcsio.text.Text.parameter_data`
+
+   Behaves as a dict.  A version number counts every change, including
+   changes to the keywords of any one parameter, so that objects built
+   from the parameters know when they are stale without comparing them.
+
+   :param kvs: optional, pairs of index and a dict of generic keywords
+   :type kvs: dict or list of pairs
+   """
+   def __init__(self,kvs=[]):
+      super().__init__()
+      self.version = 0
+      self.update(kvs)
+   def _changed(self):
+      self.version += 1
+   def __setitem__(self,index,keywords):
+      if not isinstance(keywords,_ParameterKeywords) or keywords._owner is not self:
+         keywords = _ParameterKeywords(self,keywords)
+      super().__setitem__(index,keywords)
+      self._changed()
+   def __delitem__(self,index):
+      super().__delitem__(index)
+      self._changed()
+   def pop(self,*args):
+      self._changed()
+      return super().pop(*args)
+   def popitem(self):
+      self._changed()
+      return super().popitem()
+   def clear(self):
+      super().clear()
+      self._changed()
+   def setdefault(self,index,default=None):
+      if index not in self: self[index] = default
+      return self[index]
+   def update(self,kvs=[],**kwargs):
+      if isinstance(kvs,dict): kvs = kvs.items()
+      for index, keywords in kvs: self[index] = keywords
+      for index, keywords in kwargs.items(): self[index] = keywords
+
+class _ParameterKeywords(dict):
+   """The generic keywords of one parameter. Changes are reported to
+   the :class:`fcsio.text.parameters.ParameterData` holding them"""
+   def __init__(self,owner,keywords):
+      super().__init__(keywords)
+      self._owner = owner
+   def __setitem__(self,keyword,value):
+      super().__setitem__(keyword,value)
+      self._owner._changed()
+   def __delitem__(self,keyword):
+      super().__delitem__(keyword)
+      self._owner._changed()
+   def pop(self,*args):
+      self._owner._changed()
+      return super().pop(*args)
+   def popitem(self):
+      self._owner._changed()
+      return super().popitem()
+   def clear(self):
+      super().clear()
+      self._owner._changed()
+   def setdefault(self,keyword,default=None):
+      if keyword not in self: self[keyword] = default
+      return self[keyword]
+   def update(self,*args,**kwargs):
+      super().update(*args,**kwargs)
+      self._owner._changed()
+
 class Parameters:
    """class to access and modify the parameters defined by the
    TEXT segement with data stored in the DATA segement
 
    input values are usually accessed through FCS properties
 
+   The list of :class:`fcsio.text.parameters.Parameter` objects and a
+   map from short name to position are built once and reused until
+   :class:`fcsio.text.Text.parameter_data` changes.
+
    :param text: the text object associated with an FCS object
    :param data: the data object associated iwth an FCS object
    :type text: :class:`fcsio.text.Text`
@@ -30,7 +105,9 @@ class Parameters:
    def __init__(self,text,data):
       self._text = text
       self._data = data
-      #self._parameters = [Parameter(i,self._text.parameter_data) for i in range(1,int(self._text['$PAR']))]
+      self._version = None # version of parameter_data the cache was built from
+      self._parameters = []
+      self._short_names = {}
    def __len__(self):
       return len(self._get_parameters())
    def _get_parameters(self):
@@ -39,20 +116,34 @@ class Parameters:
       :return: parameters
       :rtype: list of :class:`fcsio.test.parameters.Parameter`
       """
-      return [Parameter(i,self._text.parameter_data) for i in sorted(self._text.parameter_data)]
+      pdata = self._text.parameter_data
+      if self._version != pdata.version:
+         indecies = sorted(pdata)
+         self._parameters = [Parameter(i,pdata) for i in indecies]
+         self._short_names = {}
+         for j, i in enumerate(indecies):
+            """the first parameter with a short name wins like list.index"""
+            self._short_names.setdefault(pdata[i].get('$PnN'),j)
+         self._version = pdata.version
+      return self._parameters
    def __iter__(self):
       for p in self._get_parameters():
          yield p
 
-   def add(self,short_name,index=0,amplification_type=(0,0),default=0):
+   def add(self,short_name,index=0,amplification_type=(0,0),default=0,values=None):
       """Add a parameter to the fcs.
 
+      The new column is appended in one step and moved into place by
+      permuting columns, so no event is visited.
+
       :param short_name: short name
       :param amplification_type: amplification type (optional)
       :param default: initialize the data to this
+      :param values: optional, the data for every event, used instead of default
       :type short_name: string
       :type amplification_type: tuple(float,float)
       :type default: float
+      :type values: :class:`array.array` or list
       """
       # start by appending it
       ks = sorted(list(self._text.parameter_data.keys()))
@@ -60,15 +151,17 @@ class Parameters:
       if len(ks) > 0:
          last = ks[-1]+1
       self._text.parameter_data[last] = {
-         '$PnB':'32',
+         '$PnB':str(array(self._data.typecode).itemsize*8),
          '$PnE':','.join([str(x) for x in amplification_type]),
          '$PnN':short_name,
-         '$PnR':str(int(math.ceil(default)))
+         '$PnR':str(int(math.ceil(default if values is None or len(values) == 0 else max(values))))
       }
       # now set the data
-      mat = self._data.matrix
-      for row in mat: row.append(float(default))
-      self._data.matrix = mat
+      try:
+         self._data.add_column(values,default)
+      except ValueError:
+         del self._text.parameter_data[last]
+         raise
       # now we can reorder to put last in index
       ks.insert(index,last)
       params = self._get_parameters()
@@ -89,13 +182,9 @@ class Parameters:
          i += 1
          old2new[p.index] = i
          new2old[i] = p.index
-      # Fix the data first
-      mat = self._data.matrix
-      #print(old2new)
-      newmat = []
-      for row in mat:
-         newmat.append([row[new2old[i]-1] for i in range(1,len(new2old.keys())+1)])
-      self._data.matrix = newmat
+      # Fix the data first. this only permutes the columns
+      position = dict([(num,j) for j, num in enumerate(sorted(self._text.parameter_data))])
+      self._data.reorder([position[new2old[i]] for i in range(1,len(new2old.keys())+1)])
       # now the data is fixed.  we must fix the parameters
       cache = {}
       old_keys = list(self._text.parameter_data.keys())
@@ -113,30 +202,29 @@ class Parameters:
       :rtype: int
       """
       if short_name is not None:
-         return [x.short_name for x in self._get_parameters()].index(short_name)
+         self._get_parameters()
+         if short_name not in self._short_names:
+            raise ValueError(str(short_name)+' is not a parameter short name')
+         return self._short_names[short_name]
       return None
    def delete(self,short_names=[]):
       """Remove a list of parameters defined by the list of short names
 
+      The columns of the removed parameters are dropped from the data
+      without visiting any event, and the remaining parameters are
+      renumbered in order.
+
       :param short_names: the PnP short names as a list
       :type short_name: list of strings
       """
-      removed_indecies = []
-      for short_name in short_names:
-         for p in self.parameters:
-            if p.short_name != short_name: continue
-            """ delete this parameter"""
-            index = p.index
-            del self._text.parameter_data[index]
-            removed_indecies.append(index)
-      filtered_matrix = []
-      for row in self._data.matrix:
-         """ drop columns that were dropped """
-         filtered_matrix.append(row)
-         #if len(row) < 48:
-         #   print(len(row))
-         #print('rowlen '+str(len(new_row)))
-      self._data.matrix = filtered_matrix
+      names = set(short_names)
+      pdata = self._text.parameter_data
+      removed = [j for j, p in enumerate(self._get_parameters()) if p.short_name in names]
+      if len(removed) == 0: return
+      self._data.remove_columns(removed)
+      kept = [pdata[num] for num in sorted(pdata) if pdata[num].get('$PnN') not in names]
+      pdata.clear()
+      for num, keywords in enumerate(kept): pdata[num+1] = keywords
 
 class Parameter:
    """A class defining a single Parameter. These are attributes
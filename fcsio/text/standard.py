@@ -1,3 +1,30 @@
+def byte_order(value):
+   """Get the byte order described by a $BYTEORD value.  Bytes numbered
+   in ascending order (1,2 or 1,2,3,4 or 1,2,3,4,5,6,7,8) are little
+   endian and in descending order are big endian.  Mixed orders such as
+   3,4,1,2 are not supported.
+
+   :param value: $BYTEORD such as 1,2,3,4
+   :type value: string
+   :return: 'little endian' or 'big endian'
+   :rtype: string
+   """
+   order = byte_order_numbers(value)
+   if order == list(range(1,len(order)+1)): return 'little endian'
+   if order == list(range(len(order),0,-1)): return 'big endian'
+   raise ValueError("Unsupported byte order "+value)
+
+def byte_order_numbers(value):
+   """Get the byte numbers of a $BYTEORD value
+
+   :param value: $BYTEORD such as 1,2,3,4
+   :type value: string
+   :return: the byte numbers in order
+   :rtype: list of ints
+   """
+   try: return [int(x) for x in value.split(',')]
+   except ValueError: raise ValueError("Unsupported byte order "+value)
+
 class Standard:
    """ interact with text fields through standard key words,
    these EXCLUDE parameters which are available in 'parameter'
@@ -59,21 +86,27 @@ class Standard:
    @property
    def BYTEORD(self):
       """Get the byte order type as either 'little endian' or 'big endian'
+      from the order of the byte numbers in $BYTEORD
 
       **Setter:** set the key word from either 'little endian' or 'big endian' string
 
       :return: the BYTEORD description
       :rtype: string that is either 'little endian' or 'big endian'
       """
-      if self._text['$BYTEORD'] == '1,2,3,4': return 'little endian'
-      if self._text['$BYTEORD'] == '4,3,2,1': return 'big endian'
-      raise ValueError("Unsupported byte order "+self._text['$BYTEORD'])
+      return byte_order(self._text['$BYTEORD'])
    @BYTEORD.setter
    def BYTEORD(self,val):
-      """ Byte order must be 'little endian' or 'big endian'"""
-      if val == 'little endian': self._text['$BYTEORD'] = '1,2,3,4'
-      elif val == 'big endian': self._text['$BYTEORD'] = '4,3,2,1'
-      else: ValueError("Must set BYTEORD to either 'little endian' or 'big endian'")
+      """ Byte order must be 'little endian' or 'big endian'. The number
+      of bytes already in $BYTEORD is kept, 4 if there is none"""
+      width = 4
+      if '$BYTEORD' in self._text:
+         try: width = len(byte_order_numbers(self._text['$BYTEORD']))
+         except ValueError: pass
+      order = list(range(1,width+1))
+      if val == 'little endian': pass
+      elif val == 'big endian': order.reverse()
+      else: raise ValueError("Must set BYTEORD to either 'little endian' or 'big endian'")
+      self._text['$BYTEORD'] = ','.join([str(x) for x in order])
 
    @property
    def DATATYPE(self):
@@ -0,0 +1,233 @@
+"""Write FCS files a block of events at a time
+
+The DATA segment is streamed to the output handle as blocks of events
+arrive, so the whole segment never needs to be held in memory.  The
+header and TEXT are written first with room reserved after the TEXT,
+then patched in place once the number of events and the byte range of
+the DATA segment are known.
+
+"""
+
+from math import ceil
+from fcsio.data import ColumnStats, column_stats, merge_stats
+
+def get_header_bytes(version,text_start,text_end,data_start,data_end,other_ranges=[]):
+   """Build the bytes of an FCS header
+
+   DATA offsets past 99,999,999 do not fit in the header. In that case
+   they are written as zeros and readers get them from TEXT.
+
+   :param version: version such as FCS3.1
+   :param text_start: byte offset of the first byte of TEXT
+   :param text_end: byte offset of the last byte of TEXT
+   :param data_start: byte offset of the first byte of DATA
+   :param data_end: byte offset of the last byte of DATA
+   :param other_ranges: (start, end) byte offsets of each OTHER segment
+   :type version: string
+   :type text_start: int
+   :type text_end: int
+   :type data_start: int
+   :type data_end: int
+   :type other_ranges: list of (int,int) tuples
+   :return: the header
+   :rtype: bytearray
+   """
+   other_padding_length = 20
+   if data_end > 99999999:
+      data_start = 0
+      data_end = 0
+   ostr =  version.ljust(10)
+   ostr += str(text_start).rjust(8)
+   ostr += str(text_end).rjust(8)
+   ostr += str(data_start).rjust(8)
+   ostr += str(data_end).rjust(8)
+   ostr += str(0).rjust(8) # ANALYSIS start
+   ostr += str(0).rjust(8) # ANALYSIS end
+   for start, end in other_ranges:
+      ostr += str(start).rjust(other_padding_length)
+      ostr += str(end).rjust(other_padding_length)
+   return bytes(ostr,'ascii')
+
+class FCSWriter:
+   """Stream an FCS file to a handle a block of events at a time
+
+   The FCS object supplies the version, TEXT keywords, parameters and
+   OTHER segments.  Events are supplied separately through
+   :class:`fcsio.writer.FCSWriter.write_chunk`, for example from
+   :class:`fcsio.data.Data.iter_chunks` of another file or from a
+   generator. Peak memory is one block of events.
+
+   .. code-block:: python
+
+      with open('out.fcs','wb') as of:
+         writer = FCSWriter(of,fcs)
+         for cols in fcs.data.iter_chunks():
+            writer.write_chunk(cols)
+         writer.close()
+
+   .. warning:: Like :class:`fcsio.FCSFactory`, the writer updates the
+                TEXT of the FCS object it was given so that it
+                describes the file that was written.
+
+   :param fh: a writable and seekable binary handle
+   :param fcs: the FCS object providing TEXT and OTHER segments
+   :param essential: optional, False by default, and if True, do not write the OTHER segments
+   :param adjust_range: optional, True by default, set each $PnR from the largest value written
+   :type fh: binary file handle
+   :type fcs: :class:`fcsio.FCS`
+   :type essential: bool
+   :type adjust_range: bool
+   """
+   def __init__(self,fh,fcs,essential=False,adjust_range=True):
+      if fcs.standard.BEGINSTEXT != 0:
+          raise ValueError('Need to implement supplemental text here')
+      self._fh = fh
+      self._fcs = fcs
+      self._adjust_range = adjust_range
+      self._other = [] if essential else fcs.other
+      self._count = 0
+      self._bytes_written = 0
+      self._stats = [ColumnStats(0,None,None) for p in fcs.parameters]
+      self._closed = False
+      """every offset is relative to where this data set begins"""
+      self._base = fh.tell()
+
+      basic_header_length = 58
+      other_padding_length = 20
+      self._text_start = basic_header_length + other_padding_length*2*len(self._other)
+
+      """reserve room for TEXT to grow when the final values go in"""
+      fcs.standard.BEGINDATA = 0
+      fcs.standard.ENDDATA = 0
+      fcs.standard.NEXTDATA = 0
+      fcs.text['$TOT'] = 0
+      reserve = 1000+20*len(self._stats)
+      self._data_start = self._text_start+len(fcs.text.bytes)+reserve
+      fcs.standard.BEGINDATA = self._data_start
+      self._write_text()
+      fh.seek(self._base+self._data_start)
+
+   def _write_text(self):
+      """(re)write the header and TEXT in the space before DATA"""
+      fcs = self._fcs
+      text_bytes = fcs.text.bytes
+      text_end = self._text_start+len(text_bytes)-1
+      if text_end >= self._data_start:
+         raise ValueError('TEXT outgrew the space reserved for it. implementation problem')
+      data_end = self._data_start+self._bytes_written-1
+      other_ranges = []
+      prev = data_end
+      for segment in self._other:
+         other_ranges.append((prev+1,prev+len(segment)))
+         prev += len(segment)
+      header = get_header_bytes(fcs.version,self._text_start,text_end,
+                                self._data_start,data_end,other_ranges)
+      fh = self._fh
+      position = fh.tell()
+      fh.seek(self._base)
+      fh.write(header)
+      fh.write(text_bytes)
+      fh.write(b' '*(self._data_start-text_end-1))
+      fh.seek(position)
+
+   def write_chunk(self,cols):
+      """Append a block of events
+
+      :param cols: values for each parameter, in parameter order
+      :type cols: list of :class:`array.array` or lists
+      """
+      if self._closed: raise ValueError('FCSWriter is closed')
+      if len(cols) != len(self._stats):
+         raise ValueError('expected '+str(len(self._stats))+' parameters got '+str(len(cols)))
+      if len(cols) == 0 or len(cols[0]) == 0: return
+      encoded = self._fcs.data.encode(cols)
+      self._fh.write(encoded)
+      self._bytes_written += len(encoded)
+      self._count += len(cols[0])
+      self._stats = [merge_stats(t,column_stats(c)) for t, c in zip(self._stats,cols)]
+
+   def write_events(self,rows):
+      """Append a block of events given as rows
+
+      :param rows: events, each a sequence of values in parameter order
+      :type rows: list of lists
+      """
+      rows = list(rows)
+      if len(rows) == 0: return
+      self.write_chunk([list(x) for x in zip(*rows)])
+
+   @property
+   def event_count(self):
+      """Get the number of events written so far
+
+      :return: event count
+      :rtype: int
+      """
+      return self._count
+
+   @property
+   def stats(self):
+      """Get the statistics of each parameter over the events written so far,
+      kept up to date a block at a time
+
+      :return: count, min and max of each parameter in order
+      :rtype: list of :class:`fcsio.data.ColumnStats`
+      """
+      return self._stats
+
+   def close(self,more=False):
+      """Write the OTHER segments and CRC and patch the header and TEXT.
+      The handle itself is left open.
+
+      :param more: optional, False by default, and if True another data set will be written immediately after this one and $NEXTDATA points to it
+      :type more: bool
+      :return: the number of bytes written for this data set
+      :rtype: int
+      """
+      if self._closed: return self._size
+      self._closed = True
+      fcs = self._fcs
+      if self._adjust_range:
+         for p, stats in zip(fcs.parameters,self._stats):
+            if stats.count == 0: p.range = 1 # no data, so just default to one
+            elif fcs.standard.DATATYPE == 'I': p.range = stats.max+1
+            else: p.range = ceil(stats.max)
+      fcs.text['$TOT'] = self._count
+      fcs.standard.ENDDATA = self._data_start+self._bytes_written-1
+      for segment in self._other: self._fh.write(segment)
+      self._fh.write(bytes('0'*8,'ascii')) # add the CRC
+      self._size = self._fh.tell()-self._base
+      if more: fcs.standard.NEXTDATA = self._size
+      self._write_text()
+      return self._size
+
+   def __enter__(self):
+      return self
+   def __exit__(self,exc_type,exc_value,traceback):
+      if exc_type is None: self.close()
+
+def write_datasets(fh,fcs_list,essential=False,adjust_range=True,chunk_size=65536):
+   """Write several FCS objects as the data sets of one file in a single
+   pass, linking them through $NEXTDATA.  Events are streamed a block at
+   a time with :class:`fcsio.writer.FCSWriter`.
+
+   :param fh: a writable and seekable binary handle
+   :param fcs_list: the data sets in the order they are written
+   :param essential: optional, False by default, and if True, do not write the OTHER segments
+   :param adjust_range: optional, True by default, set each $PnR from the largest value written
+   :param chunk_size: optional, the number of events written at a time
+   :type fh: binary file handle
+   :type fcs_list: list of :class:`fcsio.FCS`
+   :type essential: bool
+   :type adjust_range: bool
+   :type chunk_size: int
+   :return: the number of bytes written
+   :rtype: int
+   """
+   fcs_list = list(fcs_list)
+   total = 0
+   for i, fcs in enumerate(fcs_list):
+      writer = FCSWriter(fh,fcs,essential,adjust_range)
+      for cols in fcs.data.iter_chunks(chunk_size): writer.write_chunk(cols)
+      total += writer.close(more=i < len(fcs_list)-1)
+   return total
@@ -0,0 +1,51 @@
+"""Copy-on-write copies from :class:`fcsio.FCS.copy`"""
+
+import unittest
+from fcsio import FCS
+from tests.test_parameters import make_raw, values, short_names
+
+class TestCopy(unittest.TestCase):
+   def setUp(self):
+      self.fcs = FCS(make_raw())
+      self.fcs.text['$FIL'] = 'original.fcs'
+      self.expected = values(FCS(make_raw()))
+   def test_text(self):
+      other = self.fcs.copy()
+      other.text['$FIL'] = 'copy.fcs'
+      other.text['$COM'] = 'a copy'
+      list(other.parameters)[0].short_name = 'FSC-H'
+      self.assertEqual(self.fcs.text['$FIL'],'original.fcs')
+      self.assertFalse('$COM' in self.fcs.text)
+      self.assertEqual(short_names(self.fcs),['FSC-A','SSC-A','CD3'])
+      self.assertEqual(short_names(other),['FSC-H','SSC-A','CD3'])
+   def test_text_of_original(self):
+      other = self.fcs.copy()
+      self.fcs.text['$FIL'] = 'changed.fcs'
+      self.fcs.text.parameter_data[2]['$PnN'] = 'SSC-H'
+      self.assertEqual(other.text['$FIL'],'original.fcs')
+      self.assertEqual(short_names(other),['FSC-A','SSC-A','CD3'])
+   def test_undecoded_columns(self):
+      other = self.fcs.copy()
+      other.parameters.delete(['SSC-A'])
+      other.parameters.add('Time',default=5)
+      self.assertEqual(values(self.fcs),self.expected)
+      self.assertEqual(values(other),[[5]*20,self.expected[0],self.expected[2]])
+   def test_decoded_columns(self):
+      self.fcs.data.columns
+      other = self.fcs.copy()
+      other.data.columns = [c[0:10] for c in other.data.columns]
+      self.assertEqual(values(self.fcs),self.expected)
+      self.assertEqual(self.fcs.standard.TOT,20)
+      self.assertEqual(other.standard.TOT,10)
+   def test_matrix(self):
+      self.fcs.data.matrix[0][0] = -1
+      other = self.fcs.copy()
+      other.data.matrix[1][0] = -2
+      self.assertEqual(values(self.fcs)[0][0:2],[-1,1])
+      self.assertEqual(values(other)[0][0:2],[-1,-2])
+   def test_written_copy(self):
+      other = self.fcs.copy()
+      self.assertEqual(other.output_constructor().fcs_bytes,self.fcs.output_constructor().fcs_bytes)
+
+if __name__ == '__main__':
+   unittest.main()
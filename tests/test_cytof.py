@@ -0,0 +1,41 @@
+"""The CyTOF OTHER segment in :mod:`fcsio.cytof`"""
+
+import unittest, struct, random
+from fcsio.cytof import CyTOFOther
+
+NAMES = ['Time','Event_length','Ir191Di(Ir191)']
+
+def make_other(rows,names=NAMES):
+   columns = ''.join(['<SegmentColumns><ColumnIndex>'+str(i)+'</ColumnIndex><ColumnName>'+n+
+                      '</ColumnName></SegmentColumns>' for i, n in enumerate(names)])
+   xml = '<FCSHeaderSchema xmlns="urn:test"><Info><Run>1</Run></Info>'+columns+'</FCSHeaderSchema>'
+   return xml.encode('utf-8')+b''.join([struct.pack('<'+str(len(r))+'f',*r) for r in rows])
+
+class TestCyTOFOther(unittest.TestCase):
+   def setUp(self):
+      rng = random.Random(1)
+      """values that are exact in single precision"""
+      self.rows = [[float(rng.randrange(0,1000)) for n in NAMES] for i in range(0,101)]
+
+   def test_matrix_has_every_row(self):
+      other = CyTOFOther(make_other(self.rows))
+      self.assertEqual(other.event_count,101)
+      self.assertEqual(other.matrix,self.rows)
+
+   def test_columns(self):
+      other = CyTOFOther(memoryview(make_other(self.rows)+b'\x00\x01'))
+      self.assertEqual(other.column_names,NAMES)
+      self.assertEqual(list(other.columns.keys()),NAMES)
+      self.assertEqual(list(other.column(2)),[r[2] for r in self.rows])
+      self.assertIs(other.values,other.values)
+
+   def test_no_columns(self):
+      other = CyTOFOther(make_other([],names=[]))
+      with self.assertRaises(ValueError): other.event_count
+      with self.assertRaises(ValueError): other.matrix
+
+   def test_not_xml(self):
+      with self.assertRaises(ValueError): CyTOFOther(b'\x00\x01\x02')
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,142 @@
+"""Round trips of the binary DATA layouts through :class:`fcsio.data.Data`"""
+
+import unittest, random, struct, io
+from array import array
+from fcsio import FCS, FCSOptions, read_metadata
+
+_struct_codes = {8:'B',16:'H',32:'I',64:'Q'}
+
+def make_int_fcs(bits,ranges,byteord,count=200,seed=1):
+   """Bytes of an FCS with DATATYPE I and the given $PnB and $PnR, and the
+   values written, which use every bit so the masks matter"""
+   rng = random.Random(seed)
+   fcs = FCS(fcs_options=FCSOptions())
+   fcs.standard.DATATYPE = 'I'
+   fcs.text['$BYTEORD'] = byteord
+   for i in range(0,len(bits)):
+      fcs.parameters.add('P'+str(i+1),index=len(fcs.parameters))
+   for i, b in enumerate(bits):
+      fcs.text.parameter_data[i+1]['$PnB'] = str(b)
+   cols = [[rng.randrange(0,1 << b) for j in range(0,count)] for b in bits]
+   fcs.data.columns = cols
+   fcs.output_constructor(adjust_range=False)
+   for i, r in enumerate(ranges):
+      fcs.text.parameter_data[i+1]['$PnR'] = str(r)
+   return fcs.output_constructor(adjust_range=False).fcs_bytes, cols
+
+def make_float_fcs(datatype,byteord,count=200,seed=1):
+   """Bytes of an FCS with floating point DATA and the values written"""
+   rng = random.Random(seed)
+   fcs = FCS(fcs_options=FCSOptions(datatype))
+   fcs.text['$BYTEORD'] = byteord
+   for name in ['FSC-A','SSC-A','CD3']:
+      fcs.parameters.add(name,index=len(fcs.parameters))
+   cols = [[rng.gauss(50,10) for j in range(0,count)] for k in range(0,3)]
+   fcs.data.columns = cols
+   return fcs.output_constructor().fcs_bytes, cols
+
+def data_segment(raw):
+   fcs = FCS(raw,load_data=False)
+   return raw[fcs.standard.BEGINDATA:fcs.standard.ENDDATA+1]
+
+class TestIntegerData(unittest.TestCase):
+   bits = [8,16,32,64,16]
+   ranges = [256,1000,2**32,2**20,2**16]
+
+   def check_mixed_width(self,byteord,prefix):
+      raw, cols = make_int_fcs(self.bits,self.ranges,byteord)
+      fmt = prefix+''.join([_struct_codes[b] for b in self.bits])
+      rows = list(struct.iter_unpack(fmt,data_segment(raw)))
+      masks = [(1 << (r-1).bit_length())-1 for r in self.ranges]
+      expected = [[v & m for v in c] for c, m in zip(zip(*rows),masks)]
+      fcs = FCS(raw)
+      self.assertEqual([list(c) for c in fcs.data.columns],expected)
+      self.assertEqual([c.typecode for c in fcs.data.columns],[c.typecode for c in fcs.data.layout])
+      again = FCS(fcs.output_constructor(adjust_range=False).fcs_bytes)
+      self.assertEqual([list(c) for c in again.data.columns],expected)
+
+   def test_mixed_width_little_endian(self):
+      self.check_mixed_width('1,2,3,4','<')
+   def test_mixed_width_big_endian(self):
+      self.check_mixed_width('4,3,2,1','>')
+   def test_short_byte_order(self):
+      raw, cols = make_int_fcs([16,16],[2**16,2**16],'2,1')
+      rows = list(struct.iter_unpack('>HH',data_segment(raw)))
+      self.assertEqual([list(c) for c in FCS(raw).data.columns],[list(c) for c in zip(*rows)])
+
+   def test_matrix_keeps_widths(self):
+      raw, cols = make_int_fcs([8,16,64],[256,2**16,2**64],'1,2,3,4')
+      fcs = FCS(raw)
+      matrix = fcs.data.matrix
+      out = fcs.output_constructor(adjust_range=False).fcs_bytes
+      self.assertEqual([c.typecode for c in fcs.data.columns],[c.typecode for c in fcs.data.layout])
+      self.assertEqual(data_segment(out),data_segment(raw))
+      self.assertEqual(FCS(out).data.matrix,matrix)
+
+   def test_iter_chunks(self):
+      raw, cols = make_int_fcs(self.bits,self.ranges,'1,2,3,4')
+      fcs = FCS(raw)
+      blocks = list(fcs.data.iter_chunks(37))
+      joined = [sum([list(b[j]) for b in blocks],[]) for j in range(0,len(self.bits))]
+      self.assertEqual(joined,[list(c) for c in FCS(raw).data.columns])
+
+class TestFloatData(unittest.TestCase):
+   def check(self,datatype,byteord,fmt):
+      raw, cols = make_float_fcs(datatype,byteord)
+      rows = list(struct.iter_unpack(fmt,data_segment(raw)))
+      fcs = FCS(raw)
+      self.assertEqual(fcs.data.matrix,[list(r) for r in rows])
+      self.assertEqual(FCS(fcs.output_constructor().fcs_bytes).data.matrix,fcs.data.matrix)
+
+   def test_single_little_endian(self):
+      self.check('F','1,2,3,4','<3f')
+   def test_single_big_endian(self):
+      self.check('F','4,3,2,1','>3f')
+   def test_double_little_endian(self):
+      self.check('D','1,2,3,4,5,6,7,8','<3d')
+   def test_double_big_endian(self):
+      self.check('D','8,7,6,5,4,3,2,1','>3d')
+   def test_double_keeps_precision(self):
+      raw, cols = make_float_fcs('D','1,2,3,4')
+      self.assertEqual([list(c) for c in FCS(raw).data.columns],cols)
+
+   def test_unsupported_byte_order(self):
+      for byteord in ['3,4,1,2','1,2,3']:
+         with self.assertRaises(ValueError): make_float_fcs('F',byteord)
+
+class TestMatrixColumns(unittest.TestCase):
+   def test_round_trip(self):
+      raw, cols = make_float_fcs('F','1,2,3,4')
+      fcs = FCS(raw)
+      columns = [list(c) for c in fcs.data.columns]
+      matrix = fcs.data.matrix
+      self.assertEqual(matrix,[list(r) for r in zip(*columns)])
+      matrix[0][1] = 7.0
+      self.assertEqual(fcs.data.columns[1][0],7.0)
+      fcs.data.matrix = [r[:] for r in matrix[0:5]]
+      self.assertEqual(fcs.data.event_count,5)
+      self.assertEqual(FCS(fcs.output_constructor().fcs_bytes).data.matrix,matrix[0:5])
+
+class TestMetadata(unittest.TestCase):
+   def test_undecodable_data_is_not_read(self):
+      raw, cols = make_float_fcs('F','1,2,3,4')
+      for old, new in [(b'$DATATYPE/F',b'$DATATYPE/A'),(b'$BYTEORD/1,2,3,4',b'$BYTEORD/3,4,1,2')]:
+         changed = raw.replace(old,new)
+         fcs = read_metadata(io.BytesIO(changed))
+         self.assertFalse(fcs.data.loaded)
+         self.assertEqual(len(fcs.parameters),3)
+         with self.assertRaises(ValueError): FCS(changed).data.columns
+
+class TestStats(unittest.TestCase):
+   def test_filters_carry_stats(self):
+      raw, cols = make_float_fcs('F','1,2,3,4',count=1000)
+      fcs = FCS(raw)
+      gated = fcs.filter.gate('CD3',min=50)
+      self.assertIsNotNone(fcs.data.stats(2,find=False))
+      for j, c in enumerate(gated.data.columns):
+         known = gated.data.stats(j,find=False)
+         if known is not None: self.assertEqual(known,(len(c),min(c),max(c)))
+      self.assertTrue(min(gated.data.columns[2]) >= 50)
+
+if __name__ == '__main__':
+   unittest.main()
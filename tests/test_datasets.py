@@ -0,0 +1,49 @@
+"""Writing and opening files, including files of several data sets"""
+
+import unittest, os, tempfile, shutil
+from fcsio import FCS, open_all
+from fcsio.writer import write_datasets
+from tests.test_data import make_float_fcs, make_int_fcs
+
+class TestFiles(unittest.TestCase):
+   def setUp(self):
+      self.folder = tempfile.mkdtemp()
+   def tearDown(self):
+      shutil.rmtree(self.folder)
+   def path(self,name):
+      return os.path.join(self.folder,name)
+
+   def test_write_and_open_all(self):
+      sets = [make_float_fcs('F','1,2,3,4',count=50,seed=1),
+              make_int_fcs([8,16,32],[256,2**16,2**32],'4,3,2,1',count=70,seed=2),
+              make_float_fcs('D','1,2,3,4,5,6,7,8',count=30,seed=3)]
+      fcs_list = [FCS(raw) for raw, cols in sets]
+      matrices = [fcs.data.matrix for fcs in fcs_list]
+      with open(self.path('multi.fcs'),'wb') as of:
+         total = write_datasets(of,fcs_list,adjust_range=False,chunk_size=16)
+      self.assertEqual(total,os.path.getsize(self.path('multi.fcs')))
+      datasets = open_all(self.path('multi.fcs'))
+      self.assertEqual(len(datasets),3)
+      self.assertEqual([fcs.data.matrix for fcs in datasets],matrices)
+      self.assertEqual(datasets[1].standard.DATATYPE,'I')
+
+   def test_unchanged_data_is_copied(self):
+      raw, cols = make_int_fcs([8,16,64],[256,2**16,2**64],'1,2,3,4',count=100)
+      with open(self.path('in.fcs'),'wb') as of: of.write(raw)
+      fcs = FCS.open(self.path('in.fcs'))
+      with open(self.path('out.fcs'),'wb') as of:
+         fcs.filter.events(range(10,60)).output_constructor(adjust_range=False).write_to(of)
+      expected = FCS(raw).filter.events(range(10,60))
+      self.assertEqual(FCS.open(self.path('out.fcs')).data.matrix,expected.data.matrix)
+
+   def test_output_over_input(self):
+      from fcsio.cli.utilities import reorder
+      raw, cols = make_float_fcs('F','1,2,3,4')
+      with open(self.path('same.fcs'),'wb') as of: of.write(raw)
+      reorder.external_cmd(['reorder',self.path('same.fcs'),'--reverse','-o',self.path('same.fcs')])
+      fcs = FCS.open(self.path('same.fcs'))
+      self.assertEqual([p.short_name for p in fcs.parameters],['CD3','SSC-A','FSC-A'])
+      self.assertEqual([list(c) for c in fcs.data.columns],[list(c) for c in reversed(FCS(raw).data.columns)])
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,46 @@
+"""The describe command reads only the header and TEXT"""
+
+import unittest, io, sys, os, gzip, tempfile, shutil
+from fcsio import FCS
+from fcsio.cli.utilities import describe
+from tests.test_data import make_float_fcs
+
+class TestDescribe(unittest.TestCase):
+   def setUp(self):
+      self.folder = tempfile.mkdtemp()
+      raw, cols = make_float_fcs('F','1,2,3,4',count=500)
+      fcs = FCS(raw)
+      fcs.other = [b'first segment',b'second']
+      self.raw = fcs.output_constructor().fcs_bytes
+      self.text_end = FCS(self.raw).standard.BEGINDATA
+   def tearDown(self):
+      shutil.rmtree(self.folder)
+
+   def run_describe(self,args,stdin=None):
+      out = os.path.join(self.folder,'out.txt')
+      cache = sys.stdin
+      if stdin is not None: sys.stdin = io.TextIOWrapper(stdin)
+      try: describe.external_cmd(['describe']+args+['-o',out])
+      finally:
+         if stdin is not None: sys.stdin.detach() # leave stdin open to check where it stopped
+         sys.stdin = cache
+      with open(out,'rb') as inf: return inf.read().decode('utf-8')
+
+   def test_stdin_stops_before_data(self):
+      stdin = io.BytesIO(self.raw)
+      text = self.run_describe(['-'],stdin)
+      self.assertTrue(stdin.tell() <= self.text_end)
+      self.assertIn('OTHER: True, 2 segments, 19 bytes',text)
+      self.assertIn('Events: 500',text)
+
+   def test_inputs_agree(self):
+      path = os.path.join(self.folder,'in.fcs')
+      with open(path,'wb') as of: of.write(self.raw)
+      with gzip.open(path+'.gz','wb') as of: of.write(self.raw)
+      plain = self.run_describe([path])
+      self.assertEqual(self.run_describe([path+'.gz']),plain)
+      self.assertEqual(self.run_describe(['-'],io.BytesIO(self.raw)),plain)
+      self.assertTrue(self.run_describe([path,'-s']).startswith(plain.rstrip('\n')))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,90 @@
+"""Random and density dependent downsampling in :class:`fcsio.filter.Filter`"""
+
+import unittest, random
+from fcsio import FCS, FCSOptions
+from fcsio.data import Data
+
+def make_fcs(count=5000,rare=100,seed=1):
+   """A dense population and a rare one far from it, with an EVENT
+   parameter numbering the events in order and a RARE flag"""
+   rng = random.Random(seed)
+   fcs = FCS(fcs_options=FCSOptions())
+   for name in ['A','B','EVENT','RARE']:
+      fcs.parameters.add(name,index=len(fcs.parameters))
+   points = [(rng.gauss(10,1),rng.gauss(10,1)) for i in range(0,count-rare)]+\
+            [(rng.gauss(30,1),rng.gauss(30,1)) for i in range(0,rare)]
+   fcs.data.columns = [[p[0] for p in points],[p[1] for p in points],
+                       list(range(0,count)),[0]*(count-rare)+[1]*rare]
+   return FCS(fcs.output_constructor().fcs_bytes)
+
+class TestDownsample(unittest.TestCase):
+   def test_size_and_order(self):
+      fcs = make_fcs()
+      columns = [list(c) for c in fcs.data.columns]
+      for count in [1,10,999,4999]:
+         sample = fcs.filter.downsample(count,seed=2,chunk_size=700)
+         self.assertEqual(sample.data.event_count,count)
+         self.assertEqual(sample.standard.TOT,count)
+         events = [int(x) for x in sample.data.columns[2]]
+         self.assertEqual(events,sorted(set(events)))
+         """every kept event keeps its own values"""
+         for j in range(0,4):
+            self.assertEqual(list(sample.data.columns[j]),[columns[j][i] for i in events])
+      self.assertEqual(fcs.data.event_count,5000)
+
+   def test_seed_repeats(self):
+      fcs = make_fcs()
+      a = fcs.filter.downsample(500,seed=3)
+      b = fcs.filter.downsample(500,seed=3,chunk_size=123)
+      c = fcs.filter.downsample(500,seed=4)
+      self.assertEqual(a.data.columns,b.data.columns)
+      self.assertNotEqual(a.data.columns,c.data.columns)
+
+   def test_uniform(self):
+      """each tenth of the events gets about a tenth of the sample"""
+      sample = make_fcs(count=20000).filter.downsample(2000,seed=5,chunk_size=1000)
+      tenths = [0]*10
+      for x in sample.data.columns[2]: tenths[int(x)//2000] += 1
+      self.assertTrue(all([140 < n < 260 for n in tenths]),str(tenths))
+
+   def test_edges(self):
+      fcs = make_fcs()
+      self.assertEqual(fcs.filter.downsample(5000).data.event_count,5000)
+      self.assertEqual(fcs.filter.downsample(10**6).data.event_count,5000)
+      self.assertEqual(fcs.filter.downsample(0).data.event_count,0)
+
+class TestDownsampleDensity(unittest.TestCase):
+   def test_keeps_rare_events(self):
+      fcs = make_fcs()
+      sample = fcs.filter.downsample_density(['A','B'],500,seed=1)
+      self.assertTrue(400 < sample.data.event_count < 600)
+      """a uniform sample would keep about 10"""
+      self.assertTrue(sum(sample.data.columns[3]) > 80)
+      events = list(sample.data.columns[2])
+      self.assertEqual(events,sorted(events))
+
+   def test_seed_repeats(self):
+      fcs = make_fcs()
+      a = fcs.filter.downsample_density(['A','B'],500,seed=4,cofactor=5)
+      b = fcs.filter.downsample_density(['A','B'],500,seed=4,cofactor=5)
+      self.assertEqual(a.data.columns,b.data.columns)
+
+   def test_edges(self):
+      fcs = make_fcs()
+      self.assertEqual(fcs.filter.downsample_density(['A'],10**6).data.event_count,5000)
+      self.assertEqual(fcs.filter.downsample_density(['A'],0).data.event_count,0)
+
+   def test_three_passes(self):
+      fcs = make_fcs()
+      passes = [0]
+      decode = Data._decode_events
+      def counted(self,raw,count,parameters=None):
+         if count > 0: passes[0] += 1
+         return decode(self,raw,count,parameters)
+      Data._decode_events = counted
+      try: fcs.filter.downsample_density(['A','B','EVENT'],500,seed=1,chunk_size=10**6)
+      finally: Data._decode_events = decode
+      self.assertEqual(passes[0],3)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,150 @@
+"""Gates and gate trees in :mod:`fcsio.gate`"""
+
+import unittest, random, math, os, tempfile, shutil
+from fcsio import FCS, FCSOptions
+from fcsio.gate import GateExpression, PolygonGate, EllipseGate, GateTree, pack_mask, unpack_mask
+
+def make_fcs(count=3000,seed=1):
+   rng = random.Random(seed)
+   fcs = FCS(fcs_options=FCSOptions('D'))
+   for name in ['X','Y','Z']:
+      fcs.parameters.add(name,index=len(fcs.parameters))
+   fcs.data.columns = [[rng.uniform(-20,120) for i in range(0,count)] for j in range(0,3)]
+   return FCS(fcs.output_constructor().fcs_bytes)
+
+def in_polygon(x,y,vertices):
+   """even-odd rule, testing every edge"""
+   inside = False
+   for (x0,y0), (x1,y1) in zip(vertices,vertices[1:]+vertices[0:1]):
+      if (y0 <= y) != (y1 <= y) and x < x0+(y-y0)*(x1-x0)/(y1-y0): inside = not inside
+   return inside
+
+class TestGateExpression(unittest.TestCase):
+   def check(self,expression,names,expected):
+      """compare the compiled gate to expected over a grid of values"""
+      gate = GateExpression(expression)
+      self.assertEqual(gate.short_names,names)
+      grid = [-1,0,1,2,3]
+      for values in zip(*[[grid[(i//5**j)%5] for i in range(0,5**len(names))] for j in range(0,len(names))]):
+         self.assertEqual(bool(gate.function(*values)),expected(*values),expression+' at '+str(values))
+
+   def test_precedence(self):
+      self.check('A>1 or B>1 and C>1',['A','B','C'],lambda a,b,c: a > 1 or (b > 1 and c > 1))
+      self.check('(A>1 or B>1) and C>1',['A','B','C'],lambda a,b,c: (a > 1 or b > 1) and c > 1)
+      self.check('not A>1 and B>1',['A','B'],lambda a,b: (not a > 1) and b > 1)
+      self.check('not (A>1 and B>1)',['A','B'],lambda a,b: not (a > 1 and b > 1))
+      self.check('NOT not A>=1 OR B!=0',['A','B'],lambda a,b: a >= 1 or b != 0)
+   def test_chained_comparisons(self):
+      self.check('0<A<=2',['A'],lambda a: 0 < a <= 2)
+      self.check('-1<=A<B<3',['A','B'],lambda a,b: -1 <= a < b < 3)
+      self.check('A==B',['A','B'],lambda a,b: a == b)
+      self.check('2>=A',['A'],lambda a: 2 >= a)
+   def test_names(self):
+      self.check('FSC-A>1e0 and SSC-A<-0.5e1',['FSC-A','SSC-A'],lambda a,b: a > 1 and b < -5)
+      self.check('"CD3 (PE)">1 or `1`<2',['CD3 (PE)','1'],lambda a,b: a > 1 or b < 2)
+      self.check('A>1 and A<3',['A'],lambda a: 1 < a < 3)
+      self.check('orange>1',['orange'],lambda a: a > 1)
+      self.check('A>nan',['A','nan'],lambda a,b: a > b)
+   def test_errors(self):
+      for expression in ['','  ','A','A>','A>1 and','(A>1','A>1)','A>1 B<2','and>1','A=1','A>"B']:
+         self.assertRaises(ValueError,GateExpression,expression)
+
+   def test_mask_and_filter(self):
+      fcs = make_fcs()
+      fcs.text.parameter_data[3]['$PnN'] = 'CD3 (PE)'
+      gate = GateExpression('0<X<50 and not Y>20 or "CD3 (PE)">100')
+      x, y, z = [list(c) for c in fcs.data.columns]
+      expected = [(0 < a < 50 and not b > 20) or c > 100 for a, b, c in zip(x,y,z)]
+      self.assertEqual(list(gate.mask(fcs,chunk_size=700)),[int(v) for v in expected])
+      out = fcs.filter.expression(gate)
+      self.assertEqual(out.data.event_count,sum(expected))
+      self.assertEqual(list(out.data.columns[0]),[a for a, v in zip(x,expected) if v])
+      self.assertEqual(fcs.filter.expression('X>200').data.event_count,0)
+      self.assertRaises(ValueError,fcs.filter.expression,'W>1')
+
+class TestPlaneGates(unittest.TestCase):
+   def test_polygon(self):
+      fcs = make_fcs()
+      vertices = [(-5,0),(70,30),(100,-10),(90,90),(40,60),(10,100)]
+      mask = PolygonGate('X','Y',vertices).mask(fcs,chunk_size=100)
+      xs, ys = fcs.data.columns[0], fcs.data.columns[1]
+      self.assertEqual(list(mask),[int(in_polygon(x,y,vertices)) for x, y in zip(xs,ys)])
+      self.assertTrue(0 < sum(mask) < len(mask))
+
+   def test_ellipse(self):
+      fcs = make_fcs()
+      cx, cy, rx, ry, angle = 40, 50, 45, 15, -30
+      mask = EllipseGate('X','Y',(cx,cy),(rx,ry),angle).mask(fcs)
+      t = math.radians(angle)
+      expected = []
+      for x, y in zip(fcs.data.columns[0],fcs.data.columns[1]):
+         p = (x-cx)*math.cos(t)+(y-cy)*math.sin(t)
+         q = (y-cy)*math.cos(t)-(x-cx)*math.sin(t)
+         expected.append(int((p/rx)**2+(q/ry)**2 <= 1))
+      self.assertEqual(list(mask),expected)
+      self.assertTrue(0 < sum(mask) < len(mask))
+
+   def test_invalid(self):
+      with self.assertRaises(ValueError): PolygonGate('X','Y',[(0,0),(1,1)])
+      with self.assertRaises(ValueError): EllipseGate('X','Y',(0,0),(0,1))
+      self.assertEqual(PolygonGate('X','Y',[(0,0),(1,0),(0,1)]).short_names,['X','Y'])
+
+class TestMasks(unittest.TestCase):
+   def test_pack_unpack(self):
+      rng = random.Random(2)
+      for count in [0,1,7,8,9,1000,1003]:
+         mask = bytearray([rng.randrange(0,2) for i in range(0,count)])
+         bits = pack_mask(mask)
+         self.assertEqual(bits,sum([1 << i for i in range(0,count) if mask[i]]))
+         self.assertEqual(unpack_mask(bits,count),mask)
+
+class TestGateTree(unittest.TestCase):
+   def make_tree(self,fcs,chunk_size):
+      tree = GateTree(fcs,chunk_size=chunk_size)
+      tree.add('a','X>30')
+      tree.add('b','Y<60',parent='a')
+      tree.add('c',PolygonGate('Y','Z',[(0,0),(80,20),(40,90)]),parent='b')
+      tree.add('d','Z>50',parent='a')
+      tree.add('e','1<2',parent='d')
+      tree.add('f','1>2')
+      return tree
+
+   def test_counts(self):
+      fcs = make_fcs(count=2999)
+      xs, ys, zs = fcs.data.columns
+      a = [x > 30 for x in xs]
+      b = [p and y < 60 for p, y in zip(a,ys)]
+      c = [p and in_polygon(y,z,[(0,0),(80,20),(40,90)]) for p, y, z in zip(b,ys,zs)]
+      d = [p and z > 50 for p, z in zip(a,zs)]
+      expected = {'a':sum(a),'b':sum(b),'c':sum(c),'d':sum(d),'e':sum(d),'f':0}
+      for chunk_size in [3,100,65536]:
+         tree = self.make_tree(fcs,chunk_size)
+         self.assertEqual(tree.counts(),expected)
+         self.assertEqual(list(tree.mask('c')),[int(x) for x in c])
+         tree = self.make_tree(fcs,chunk_size)
+         self.assertEqual(tree.count('b'),expected['b'])
+         self.assertEqual(tree.counts(),expected)
+      self.assertEqual(tree.fcs('d').data.event_count,expected['d'])
+      self.assertEqual(tree.children('a'),['b','d'])
+
+class TestFilterCommand(unittest.TestCase):
+   def setUp(self):
+      self.folder = tempfile.mkdtemp()
+   def tearDown(self):
+      shutil.rmtree(self.folder)
+
+   def test_negative_coordinates(self):
+      from fcsio.cli.utilities import filter
+      fcs = make_fcs()
+      source = os.path.join(self.folder,'in.fcs')
+      with open(source,'wb') as of: of.write(fcs.output_constructor().fcs_bytes)
+      vertices = [(-5,0),(70,30),(70,70)]
+      out = os.path.join(self.folder,'polygon.fcs')
+      filter.external_cmd(['filter',source,'--polygon','X','Y','--vertices','-5,0;70,30;70,70','-o',out])
+      self.assertEqual(FCS.open(out).data.event_count,sum(PolygonGate('X','Y',vertices).mask(fcs)))
+      out = os.path.join(self.folder,'ellipse.fcs')
+      filter.external_cmd(['filter',source,'--ellipse','X','Y','--center','-5,-10','--half_axes','40,20','--angle','-30','-o',out])
+      self.assertEqual(FCS.open(out).data.event_count,sum(EllipseGate('X','Y',(-5,-10),(40,20),-30).mask(fcs)))
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,145 @@
+"""Editing parameters through :class:`fcsio.text.parameters.Parameters`"""
+
+import unittest
+from fcsio import FCS, FCSOptions
+
+def make_fcs(names=['FSC-A','SSC-A','CD3'],count=20):
+   """An FCS with float columns whose values tell the parameter and event
+   apart, parameter j of event i holds 100*j+i"""
+   fcs = FCS(fcs_options=FCSOptions())
+   for name in names:
+      fcs.parameters.add(name,index=len(fcs.parameters))
+   fcs.data.columns = [[100*j+i for i in range(0,count)] for j in range(0,len(names))]
+   return fcs
+
+def make_raw(names=['FSC-A','SSC-A','CD3'],count=20):
+   return make_fcs(names,count).output_constructor().fcs_bytes
+
+def values(fcs):
+   return [list(c) for c in fcs.data.columns]
+
+def short_names(fcs):
+   return [p.short_name for p in fcs.parameters]
+
+class TestParameterCache(unittest.TestCase):
+   def setUp(self):
+      self.fcs = make_fcs()
+      self.parameters = self.fcs.parameters
+   def test_index_of(self):
+      self.assertEqual(self.parameters.indexOf('SSC-A'),1)
+      self.assertRaises(ValueError,self.parameters.indexOf,'CD4')
+   def test_first_short_name_wins(self):
+      self.fcs.text.parameter_data[3]['$PnN'] = 'FSC-A'
+      self.assertEqual(self.parameters.indexOf('FSC-A'),0)
+   def test_reused_until_changed(self):
+      first = list(self.parameters)
+      self.assertTrue(all([a is b for a, b in zip(first,self.parameters)]))
+      version = self.fcs.text.parameter_data.version
+      self.fcs.text.parameter_data[2]['$PnN'] = 'CD4'
+      self.assertNotEqual(self.fcs.text.parameter_data.version,version)
+      self.assertEqual(short_names(self.fcs),['FSC-A','CD4','CD3'])
+      self.assertEqual(self.parameters.indexOf('CD4'),1)
+      self.assertRaises(ValueError,self.parameters.indexOf,'SSC-A')
+   def test_setter_invalidates(self):
+      list(self.parameters)[0].short_name = 'FSC-H'
+      self.assertEqual(self.parameters.indexOf('FSC-H'),0)
+   def test_removed_parameter(self):
+      del self.fcs.text.parameter_data[3]
+      self.assertEqual(len(self.parameters),2)
+      self.assertEqual(short_names(self.fcs),['FSC-A','SSC-A'])
+   def test_replaced_keywords(self):
+      self.fcs.text.parameter_data[1] = dict(self.fcs.text.parameter_data[1],**{'$PnN':'Time'})
+      self.assertEqual(self.parameters.indexOf('Time'),0)
+      self.fcs.text.parameter_data[1]['$PnN'] = 'FSC-A'
+      self.assertEqual(self.parameters.indexOf('FSC-A'),0)
+
+class TestReassign(unittest.TestCase):
+   def check(self,fcs):
+      parameters = list(fcs.parameters)
+      fcs.parameters.reassign([parameters[2],parameters[0]])
+      self.assertEqual(short_names(fcs),['CD3','FSC-A'])
+      self.assertEqual(values(fcs),[[200+i for i in range(0,20)],list(range(0,20))])
+      again = FCS(fcs.output_constructor().fcs_bytes)
+      self.assertEqual(short_names(again),['CD3','FSC-A'])
+      self.assertEqual(values(again),values(fcs))
+   def test_decoded(self):
+      fcs = FCS(make_raw())
+      fcs.data.columns
+      self.check(fcs)
+   def test_undecoded(self):
+      fcs = FCS(make_raw())
+      parameters = list(fcs.parameters)
+      fcs.parameters.reassign([parameters[1],parameters[2],parameters[0]])
+      self.assertTrue(fcs.data._lazy)
+      self.assertEqual(short_names(fcs),['SSC-A','CD3','FSC-A'])
+      parameters = list(fcs.parameters)
+      fcs.parameters.reassign([parameters[2],parameters[0],parameters[1]])
+      self.assertTrue(fcs.data._lazy)
+      self.check(fcs)
+   def test_chunks_follow_order(self):
+      fcs = FCS(make_raw())
+      parameters = list(fcs.parameters)
+      fcs.parameters.reassign([parameters[2],parameters[1]])
+      blocks = list(fcs.data.iter_chunks(7))
+      self.assertTrue(fcs.data._lazy)
+      self.assertEqual([sum([list(b[j]) for b in blocks],[]) for j in range(0,2)],values(fcs))
+
+class TestAdd(unittest.TestCase):
+   expected = [list(range(0,20)),list(range(0,20)),[7]*20,[100+i for i in range(0,20)],[200+i for i in range(0,20)]]
+   def test_decoded(self):
+      fcs = FCS(make_raw())
+      fcs.data.columns
+      fcs.parameters.add('Time',index=1,default=7)
+      fcs.parameters.add('Index',index=0,values=[float(i) for i in range(0,20)])
+      self.assertEqual(short_names(fcs),['Index','FSC-A','Time','SSC-A','CD3'])
+      self.assertEqual(fcs.parameters.indexOf('Time'),2)
+      self.assertEqual(values(fcs),self.expected)
+      self.assertEqual(values(FCS(fcs.output_constructor().fcs_bytes)),self.expected)
+   def test_undecoded(self):
+      fcs = FCS(make_raw())
+      fcs.parameters.add('Time',index=1,default=7)
+      fcs.parameters.add('Index',index=0,values=[float(i) for i in range(0,20)])
+      self.assertTrue(fcs.data._lazy)
+      self.assertEqual(short_names(fcs),['Index','FSC-A','Time','SSC-A','CD3'])
+      self.assertEqual(values(fcs),self.expected)
+   def test_wrong_length(self):
+      fcs = FCS(make_raw())
+      self.assertRaises(ValueError,fcs.parameters.add,'Index',values=[1,2,3])
+      self.assertEqual(short_names(fcs),['FSC-A','SSC-A','CD3'])
+      self.assertEqual(len(fcs.data.columns),3)
+   def test_constant_column_stats(self):
+      fcs = FCS(make_raw())
+      fcs.parameters.add('Time',index=3,default=7)
+      stats = fcs.data.stats(3,find=False)
+      self.assertEqual((stats.min,stats.max),(7,7))
+
+class TestDelete(unittest.TestCase):
+   expected = [list(range(0,20)),[300+i for i in range(0,20)]]
+   def make(self):
+      return FCS(make_raw(['FSC-A','SSC-A','CD3','CD4']))
+   def check(self,fcs):
+      fcs.parameters.delete(['SSC-A','CD3','CD8'])
+      self.assertEqual(short_names(fcs),['FSC-A','CD4'])
+      self.assertEqual(sorted(fcs.text.parameter_data),[1,2])
+      self.assertEqual(values(fcs),self.expected)
+      again = FCS(fcs.output_constructor().fcs_bytes)
+      self.assertEqual(short_names(again),['FSC-A','CD4'])
+      self.assertEqual(values(again),self.expected)
+   def test_decoded(self):
+      fcs = self.make()
+      fcs.data.columns
+      self.check(fcs)
+   def test_undecoded(self):
+      fcs = self.make()
+      fcs.parameters.delete(['SSC-A','CD3'])
+      self.assertTrue(fcs.data._lazy)
+      self.assertEqual(short_names(fcs),['FSC-A','CD4'])
+      self.assertEqual(values(fcs),self.expected)
+   def test_no_match(self):
+      fcs = self.make()
+      fcs.parameters.delete(['CD8'])
+      self.assertEqual(short_names(fcs),['FSC-A','SSC-A','CD3','CD4'])
+      self.assertTrue(fcs.data._lazy)
+
+if __name__ == '__main__':
+   unittest.main()
@@ -0,0 +1,97 @@
+"""Selecting events with :class:`fcsio.data.Data.take` and :class:`fcsio.data.Data.compress`"""
+
+import unittest
+from fcsio import FCS
+from tests.test_data import make_int_fcs, data_segment
+from tests.test_parameters import make_raw, values
+
+def selected(cols,indecies):
+   return [[c[i] for i in indecies] for c in cols]
+
+class TestTake(unittest.TestCase):
+   def setUp(self):
+      self.raw = make_raw(count=50)
+      self.cols = values(FCS(self.raw))
+   def check(self,selection,indecies,decode):
+      fcs = FCS(self.raw)
+      if decode: fcs.data.columns
+      fcs.data.take(selection)
+      self.assertEqual(values(fcs),selected(self.cols,indecies))
+      self.assertEqual(fcs.standard.TOT,len(indecies))
+      self.assertEqual(values(FCS(fcs.output_constructor().fcs_bytes)),values(fcs))
+   def test_indecies(self):
+      for decode in [False,True]:
+         self.check([4,2,2,49],[4,2,2,49],decode)
+   def test_slice(self):
+      for decode in [False,True]:
+         self.check(slice(10,20),range(10,20),decode)
+         self.check(slice(-5,None),range(45,50),decode)
+         self.check(slice(1,40,3),range(1,40,3),decode)
+         self.check(range(5,0,-1),range(5,0,-1),decode)
+         self.check(slice(30,10),[],decode)
+   def test_contiguous_slice_stays_undecoded(self):
+      fcs = FCS(self.raw)
+      fcs.data.take(slice(10,20))
+      fcs.data.take(range(2,5))
+      self.assertTrue(fcs.data._lazy)
+      out = fcs.output_constructor().fcs_bytes
+      row = len(self.cols)*4
+      self.assertEqual(data_segment(out),data_segment(self.raw)[12*row:15*row])
+   def test_slice_after_add(self):
+      fcs = FCS(self.raw)
+      fcs.parameters.add('Index',index=0,values=[float(i) for i in range(0,50)])
+      fcs.data.take(slice(10,20))
+      self.assertTrue(fcs.data._lazy)
+      self.assertEqual(values(fcs),[list(range(10,20))]+selected(self.cols,range(10,20)))
+
+class TestCompress(unittest.TestCase):
+   def setUp(self):
+      self.raw, self.cols = make_int_fcs([8,16,32],[256,2**16,2**32],'4,3,2,1',count=300)
+      self.mask = bytearray([(i*7)%3 == 0 for i in range(0,300)])
+      self.kept = [i for i in range(0,300) if self.mask[i]]
+   def check(self,fcs):
+      fcs.data.compress(self.mask)
+      self.assertEqual(values(fcs),selected(self.cols,self.kept))
+      self.assertEqual([c.typecode for c in fcs.data.columns],[c.typecode for c in fcs.data.layout])
+      again = FCS(fcs.output_constructor(adjust_range=False).fcs_bytes)
+      self.assertEqual(values(again),values(fcs))
+   def test_decoded(self):
+      fcs = FCS(self.raw)
+      fcs.data.columns
+      self.check(fcs)
+   def test_undecoded(self):
+      self.check(FCS(self.raw))
+   def test_list_of_bools(self):
+      fcs = FCS(self.raw)
+      fcs.data.compress([bool(x) for x in self.mask])
+      self.assertEqual(values(fcs),selected(self.cols,self.kept))
+   def test_undecoded_reordered(self):
+      fcs = FCS(self.raw)
+      parameters = list(fcs.parameters)
+      fcs.parameters.reassign([parameters[2],parameters[0]])
+      fcs.data.compress(self.mask)
+      self.assertEqual(values(fcs),selected([self.cols[2],self.cols[0]],self.kept))
+   def test_keep_all_and_none(self):
+      fcs = FCS(self.raw)
+      fcs.data.compress(bytes([1])*300)
+      self.assertTrue(fcs.data._lazy)
+      fcs.data.compress(bytes(300))
+      self.assertEqual(values(fcs),[[],[],[]])
+      self.assertEqual(fcs.standard.TOT,0)
+   def test_wrong_length(self):
+      fcs = FCS(self.raw)
+      self.assertRaises(ValueError,fcs.data.compress,bytes(10))
+
+class TestFilter(unittest.TestCase):
+   def test_events_and_mask(self):
+      raw = make_raw(count=50)
+      fcs = FCS(raw)
+      cols = values(fcs)
+      out = fcs.filter.events(range(10,30))
+      self.assertEqual(values(out),selected(cols,range(10,30)))
+      out = fcs.filter.mask([i%2 == 0 for i in range(0,50)])
+      self.assertEqual(values(out),selected(cols,range(0,50,2)))
+      self.assertEqual(values(fcs),cols)
+
+if __name__ == '__main__':
+   unittest.main()
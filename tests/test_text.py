@@ -0,0 +1,61 @@
+"""Parsing and editing of the TEXT segment in :mod:`fcsio.text`"""
+
+import unittest
+from fcsio.text import Text, KeyWordDict
+
+def keywords(text):
+   return [(k,text[k]) for k in text.keys()]
+
+class TestParse(unittest.TestCase):
+   def test_escaped_delimiter_before_delimiter(self):
+      self.assertEqual(keywords(Text(b'/A/x///B/y/')),[('A','x/'),('B','y')])
+   def test_escaped_delimiter_inside(self):
+      self.assertEqual(keywords(Text(b'/A/x//y/B//C/z/')),[('A','x/y'),('B/C','z')])
+   def test_regex_special_delimiter(self):
+      self.assertEqual(keywords(Text(b'|A|x|B|y||z|')),[('A','x'),('B','y|z')])
+      self.assertEqual(keywords(Text(b'*A*x.*B*y**z*')),[('A','x.'),('B','y*z')])
+   def test_missing_final_delimiter(self):
+      self.assertEqual(keywords(Text(b'/A/x/B/y')),[('A','x'),('B','y')])
+   def test_parameters_are_split_out(self):
+      text = Text(b'/$PAR/2/$P1N/FSC/$P2N/SSC/$p2s/CD3/A/1/')
+      self.assertEqual(keywords(text),[('A','1')])
+      self.assertEqual(text.parameter_data,{1:{'$PnN':'FSC'},2:{'$PnN':'SSC','$PnS':'CD3'}})
+   def test_round_trip(self):
+      text = Text(b'/A/x//y/$P1N/FSC/B/ z /')
+      again = Text(text.bytes)
+      self.assertEqual(keywords(again),keywords(text))
+      self.assertEqual(again.parameter_data,text.parameter_data)
+
+class TestKeyWordDict(unittest.TestCase):
+   def setUp(self):
+      self.d = KeyWordDict([('Alpha','1'),('beta','2'),('GAMMA','3')])
+   def test_case_insensitive_access(self):
+      self.assertEqual(self.d['ALPHA'],'1')
+      self.assertEqual(self.d['Beta'],'2')
+      self.assertTrue('gamma' in self.d)
+      self.assertFalse('delta' in self.d)
+   def test_overwrite_keeps_place(self):
+      self.d['BETA'] = 'two'
+      self.assertEqual(self.d.keys(),['Alpha','BETA','GAMMA'])
+      self.assertEqual(self.d['beta'],'two')
+      self.assertEqual(len(self.d),3)
+   def test_delete_keeps_order(self):
+      del self.d['alpha']
+      self.d['Delta'] = '4'
+      self.assertEqual(self.d.keys(),['beta','GAMMA','Delta'])
+      self.assertEqual(len(self.d),3)
+      self.assertRaises(ValueError,lambda: self.d['ALPHA'])
+   def test_empty_strings_rejected(self):
+      def set_value(k,v): self.d[k] = v
+      self.assertRaises(ValueError,set_value,'','x')
+      self.assertRaises(ValueError,set_value,'x','')
+   def test_copy_is_independent(self):
+      other = self.d.copy()
+      other['alpha'] = 'one'
+      del other['GAMMA']
+      self.d['Delta'] = '4'
+      self.assertEqual(keywords(self.d),[('Alpha','1'),('beta','2'),('GAMMA','3'),('Delta','4')])
+      self.assertEqual(keywords(other),[('alpha','one'),('beta','2')])
+
+if __name__ == '__main__':
+   unittest.main()